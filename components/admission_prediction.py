@@ -1,10 +1,28 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import json
-from pathlib import Path
-            
+from components.parcoursup.catalogue import catalogue_index, filiere_dataset
+from components.parcoursup.cleaning import DEFAULT_FORMATIONS
+from components.parcoursup.gazetteer import DEFAULT_GAZETTEER, gazetteer_for
+from components.parcoursup.geo import city_coordinates
+from components.parcoursup.loading import open_store
+from components.parcoursup.optimiser import optimise_voeux
+from components.parcoursup.metrics import compute_metrics
+from components.parcoursup.models import HEURISTIC_MODEL, MODEL_LABELS, available_models, model_probabilities
+from components.parcoursup.partitions import get_partitioned_store
+from components.parcoursup.rollup import LEVEL_LABELS, geo_rollup
+from components.parcoursup.recommend import (DEFAULT_TOP_K, combined_scores, distances_from, filter_index,
+                                            profile_chances, recommend)
+from components.parcoursup.scoring import score_profiles
+from components.parcoursup.search import search_labels
+from components.parcoursup.spatial import spatial_index
+from components.parcoursup.simulation import DEFAULT_DRAWS, MAX_VOEUX, profile_probabilities, simulate_voeux
+from components.parcoursup.store import DEFAULT_SOURCE, dataset_for
+from components.parcoursup.trends import TREND_MEASURES, trend_tables
+from components.parcoursup.watcher import start_watcher
+
 def display_profil_feedback(probability):
     """Affiche les recommandations basées sur le profil avec un style amélioré"""
     try:
@@ -78,57 +96,86 @@ def display_profil_feedback(probability):
     except Exception as e:
         st.error(f"Erreur dans display_profil_feedback: {str(e)}")
 
-def load_data():
-    """Charge les données depuis le fichier JSON avec gestion des chemins"""
+def load_data(mode="auto", session=None):
+    """Charge les données via le store partagé (une seule lecture par processus).
+
+    mode : "json", "snapshot", "projected" ou "auto" (voir parcoursup.loading.open_store).
+    session : année Parcoursup à charger depuis le store partitionné (ignore mode).
+    """
+    data_path = DEFAULT_SOURCE
     try:
-        data_path = Path(__file__).resolve().parent.parent / ".data" / "parcoursup.json"
-        with open(data_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            return pd.DataFrame(data['results'])
+        # Rechargement en tâche de fond quand un fichier de .data/ change
+        start_watcher()
+        if session is not None:
+            data_path = f"session {session}"
+            return get_partitioned_store().get(session).frame
+        store = open_store(mode)
+        data_path = store.source
+        # Le DataFrame retourné est partagé entre les sessions : ne pas le modifier
+        return store.get().frame
     except Exception as e:
         st.error(f"Erreur lors du chargement des données: {e}")
         print(f"Chemin tenté: {data_path}")
         return None
 
-def calculate_admission_probability(iut_data, profile):
-    """Calcule la probabilité de recevoir une proposition selon le profil"""
-    # 1. Calculer le taux de base selon le type de bac
-    if profile['bac_type'] == "Général":
-        candidats = iut_data['nb_voe_pp_bg']
-        propositions = iut_data['prop_tot_bg']
-    elif profile['bac_type'] == "Technologique":
-        candidats = iut_data['nb_voe_pp_bt']
-        propositions = iut_data['prop_tot_bt']
-    else:  # DAEU et autres
-        candidats = iut_data['nb_voe_pp_at']
-        propositions = iut_data['prop_tot_at']
-        
-    base_rate = (propositions / candidats * 100) if candidats > 0 else 0
-
-    # 2. Bonus mention
-    mention_bonus = {
-        'Sans mention': 1.0,
-        'AB': 1.3,
-        'B': 1.6,
-        'TB': 2.0
-    }.get(profile['mention'], 1.0)
-
-    # 3. Bonus boursier amélioré
-    boursier_rate = iut_data['pct_bours'] / 100
-    boursier_bonus = 1 + max(0.1, boursier_rate) if profile['boursier'] else 1
-
-    # 4. Score final avec ajustements
-    probability = base_rate * mention_bonus * boursier_bonus
-    
-    # Limiter entre 0 et 100
-    probability = min(100, max(0, probability))
+def display_catalogue_selector(data):
+    """Choix de la filière quand l'export complet est chargé ; retourne (données restreintes, libellé)
+
+    Avec un export d'une seule formation, les données sont retournées telles quelles.
+    """
+    dataset = dataset_for(data)
+    catalogue = catalogue_index(dataset)
+    formations = catalogue.options('lib_for_voe_ins')
+    if len(formations) <= 1:
+        return data, formations[0] if formations else None
+
+    # Chaque liste ne propose que les valeurs présentes dans la sélection précédente
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        filieres = catalogue.options('fili')
+        fili = st.selectbox("Filière", filieres,
+                            index=filieres.index('BUT') if 'BUT' in filieres else 0,
+                            key="catalogue_fili")
+    with col2:
+        formations = catalogue.options('lib_for_voe_ins', catalogue.positions(fili=fili))
+        default = next((formations.index(name) for name in DEFAULT_FORMATIONS if name in formations), 0)
+        formation = st.selectbox("Formation", formations, index=default, key="catalogue_formation")
+
+    selection = {'fili': fili, 'lib_for_voe_ins': formation}
+    with st.expander("Affiner la sélection"):
+        for field, label in (('form_lib_voe_acc', "Intitulé de la formation d'accueil"),
+                             ('select_form', "Sélectivité"),
+                             ('contrat_etab', "Statut de l'établissement")):
+            choices = catalogue.options(field, catalogue.positions(**selection))
+            if len(choices) <= 1:
+                continue
+            choice = st.selectbox(label, ["Toutes"] + choices, key=f"catalogue_{field}")
+            if choice != "Toutes":
+                selection[field] = choice
+
+    return filiere_dataset(dataset, **selection).frame, formation
+
+def calculate_admission_probability(iut_data, profile, metrics=None):
+    """Calcule la probabilité de recevoir une proposition selon le profil
+
+    metrics : indicateurs dérivés précalculés de la formation (calculés à la volée si absents)
+    """
+    if metrics is None:
+        metrics = compute_metrics(iut_data.to_frame().T).iloc[0]
+
+    # Taux de base × bonus mention × bonus boursier, via le noyau de calcul partagé
+    result = score_profiles([profile], metrics)
+    probability = result.probabilities[0, 0]
+    base_rate = result.base_rates[0, 0]
+    mention_bonus = result.mention_bonus[0]
+    boursier_bonus = result.boursier_bonus[0, 0]
 
     # Calculer les statistiques pour l'affichage
     stats = {
         'capacite': iut_data['capa_fin'],
-        'places_restantes': iut_data['capa_fin'] - iut_data['acc_tot'],
-        'taux_pression': round(iut_data['voe_tot'] / iut_data['capa_fin'], 1),
-        'taux_proposition': round((iut_data['prop_tot'] / iut_data['voe_tot']) * 100, 1),
+        'places_restantes': metrics['places_restantes'],
+        'taux_pression': round(metrics['taux_pression'], 1),
+        'taux_proposition': round(metrics['taux_proposition'], 1),
         'profil_match': round(base_rate, 1),
         'mention_boost': round((mention_bonus - 1) * 100, 1),
         'boursier_boost': round((boursier_bonus - 1) * 100, 1)
@@ -136,54 +183,49 @@ def calculate_admission_probability(iut_data, profile):
     
     return probability, stats
 
+# Colonnes du tableau de comparaison : colonne source -> nom affiché
+RESULT_COLUMNS = {
+    'g_ea_lib_vx': 'etablissement',
+    'ville_etab': 'ville',
+    'region_etab_aff': 'region',
+    'capa_fin': 'capacite',
+    'voe_tot': 'nb_candidats',
+    'pct_bours': 'pct_boursiers'
+}
+
+def _comparison_table(dataset):
+    """Colonnes fixes du tableau de comparaison, renommées une fois par version des données"""
+    table = dataset.frame[list(RESULT_COLUMNS)].set_axis(list(RESULT_COLUMNS.values()), axis=1)
+    return table.reset_index(drop=True)
+
+def _results_table(dataset, chances, positions=None, distances=None, scores=None):
+    """Tableau de comparaison avec les chances du profil, restreint aux positions données"""
+    table = dataset.cached('comparison_table', _comparison_table)
+    rows = slice(None) if positions is None else positions
+    results = table.copy() if positions is None else table.take(positions)
+    results.insert(5, 'chances', chances[rows])
+    if distances is not None:
+        results['distance_km'] = distances[rows]
+        results['score'] = scores[rows]
+    return results
+
 def calculate_chances(profile, data):
     
-    """Calcule les chances pour tous les établissements"""
-    results = []
-    for _, iut in data.iterrows():
-        # Base rate calculation based on bac type
-        if profile['bac_type'] == "Général":
-            candidats = iut['nb_voe_pp_bg']
-            propositions = iut['prop_tot_bg']
-        elif profile['bac_type'] == "Technologique":
-            candidats = iut['nb_voe_pp_bt']
-            propositions = iut['prop_tot_bt']
-        else:  # DAEU et autres
-            candidats = iut['nb_voe_pp_at']
-            propositions = iut['prop_tot_at']
-        
-        base_rate = (propositions / candidats * 100) if candidats > 0 else 0
-
-        # Mention bonus
-        mention_bonus = {
-            'Sans mention': 1.0,
-            'AB': 1.3,
-            'B': 1.6,
-            'TB': 2.0
-        }.get(profile['mention'], 1.0)
-
-        # Boursier bonus
-        boursier_rate = iut['pct_bours'] / 100
-        boursier_bonus = 1 + max(0.1, boursier_rate) if profile['boursier'] else 1
-
-        # Final score calculation
-        score = base_rate * mention_bonus * boursier_bonus
-        score = min(100, max(0, score))
-
-        results.append({
-            'etablissement': iut['g_ea_lib_vx'],
-            'ville': iut['ville_etab'],
-            'region': iut['region_etab_aff'],
-            'capacite': iut['capa_fin'],
-            'nb_candidats': iut['voe_tot'],
-            'chances': round(score, 1),
-            'pct_boursiers': iut['pct_bours']
-        })
+    """Calcule les chances pour tous les établissements (lecture du cube précalculé)"""
+    dataset = dataset_for(data)
+    chances, order = profile_chances(dataset, profile)
+
+    # Colonnes reprises telles quelles (sans conversion ligne à ligne), avec l'index 0..n-1
+    results = _results_table(dataset, chances)
     
-    return pd.DataFrame(results).sort_values('chances', ascending=False)
+    if order is None:
+        return results.sort_values('chances', ascending=False)
+    return results.take(order)
 
 def display_summary_stats(data):
     """Affiche les statistiques globales"""
+    # Totaux lus dans le cube géographique de la version (pas de nouvelle agrégation)
+    totals = geo_rollup(dataset_for(data)).totals
     col1, col2, col3 = st.columns(3)
     
     with col1:
@@ -191,7 +233,7 @@ def display_summary_stats(data):
             <div style='background-color: #1565C0; padding: 20px; border-radius: 10px;'>
                 <h3 style='color: #FFFFFF; margin: 0;'>Capacité totale</h3>
                 <p style='color: #FFFFFF; font-size: 24px; font-weight: bold; margin: 10px 0 0 0;'>
-                    {data['capa_fin'].sum():,}
+                    {totals['capa_fin']:,}
                 </p>
             </div>
         """, unsafe_allow_html=True)
@@ -201,7 +243,7 @@ def display_summary_stats(data):
             <div style='background-color: #2E7D32; padding: 20px; border-radius: 10px;'>
                 <h3 style='color: #FFFFFF; margin: 0;'>Total candidatures</h3>
                 <p style='color: #FFFFFF; font-size: 24px; font-weight: bold; margin: 10px 0 0 0;'>
-                    {data['voe_tot'].sum():,}
+                    {totals['voe_tot']:,}
                 </p>
             </div>
         """, unsafe_allow_html=True)
@@ -211,11 +253,69 @@ def display_summary_stats(data):
             <div style='background-color: #EF6C00; padding: 20px; border-radius: 10px;'>
                 <h3 style='color: #FFFFFF; margin: 0;'>Total propositions</h3>
                 <p style='color: #FFFFFF; font-size: 24px; font-weight: bold; margin: 10px 0 0 0;'>
-                    {data['prop_tot'].sum():,}
+                    {totals['prop_tot']:,}
                 </p>
             </div>
         """, unsafe_allow_html=True)
         
+# Indicateurs proposés dans la vue par territoire : colonne du cube -> libellé
+ROLLUP_INDICATORS = {
+    'taux_pression': "Taux de pression (vœux / place)",
+    'taux_proposition': "Taux de proposition (%)",
+    'taux_remplissage': "Taux de remplissage (%)",
+    'part_boursiers': "Part de boursiers chez les admis (%)",
+    'part_femmes': "Part de femmes chez les admis (%)",
+    'part_tb': "Part de mentions TB chez les admis (%)",
+    'capacite': "Capacité",
+    'voeux': "Vœux"
+}
+
+def display_geo_breakdown(data):
+    """Affiche les statistiques par région, puis par académie et département d'une région choisie"""
+    rollup = geo_rollup(dataset_for(data))
+    levels = rollup.levels()
+    if 'region' not in levels:
+        return
+
+    with st.expander("🗺️ Statistiques par territoire"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            region = st.selectbox("Région", ["Toutes"] + list(rollup.table('region').index), key="rollup_region")
+        level, parent = 'region', None
+        if region != "Toutes" and 'academie' in levels:
+            level, parent = 'academie', region
+            with col2:
+                academies = list(rollup.table('academie', region).index)
+                academie = st.selectbox("Académie", ["Toutes"] + academies, key="rollup_academie")
+            if academie != "Toutes" and 'departement' in levels:
+                level, parent = 'departement', academie
+        with col3:
+            indicator = st.selectbox("Indicateur", list(ROLLUP_INDICATORS),
+                                     format_func=ROLLUP_INDICATORS.get, key="rollup_indicator")
+
+        table = rollup.table(level, parent).sort_values(indicator, ascending=False)
+        fig = px.bar(table.reset_index(), x=level, y=indicator,
+                     labels={level: LEVEL_LABELS[level], indicator: ROLLUP_INDICATORS[indicator]})
+        fig.update_layout(height=400, margin=dict(t=20, b=20))
+        st.plotly_chart(fig, use_container_width=True)
+
+        columns = {
+            'formations': "Formations",
+            'capacite': "Capacité",
+            'voeux': "Vœux",
+            'propositions': "Propositions",
+            'taux_pression': "Pression",
+            'taux_proposition': "Taux de proposition (%)",
+            'part_boursiers': "Boursiers (%)",
+            'part_femmes': "Femmes (%)",
+            'part_sansmention': "Sans mention (%)",
+            'part_ab': "AB (%)",
+            'part_b': "B (%)",
+            'part_tb': "TB (%)"
+        }
+        display = table[list(columns)].rename(columns=columns).rename_axis(LEVEL_LABELS[level])
+        st.dataframe(display.round(1), use_container_width=True)
+
 def display_explain_stats(data):
     """Affiche l'explication du jeu de données dans un expander"""
     with st.expander("📊 À propos des données utilisées"):
@@ -248,19 +348,63 @@ def display_explain_stats(data):
             </div>
         """, unsafe_allow_html=True)
 
+def _distance_filter(dataset, key):
+    """Sélection d'une ville et d'un rayon ; retourne les positions des formations dans ce rayon (None sinon)"""
+    cities = dataset.cached('city_coordinates', lambda dataset: city_coordinates(dataset.frame))
+    col1, col2 = st.columns(2)
+    with col1:
+        city = st.selectbox("Autour de", options=["(aucune)"] + sorted(cities, key=str.casefold),
+                            key=f"{key}_city")
+    with col2:
+        radius = st.number_input("Rayon (km)", min_value=5, value=100, step=5, key=f"{key}_radius")
+    if city not in cities:
+        return None
+    lat, lon = cities[city]
+    positions, _ = spatial_index(dataset).radius(lat, lon, radius)
+    return positions
+
 def display_prediction_interface(data, show_title=True):
     """Interface de prédiction des chances de recevoir une proposition"""
     
+    # Index et indicateurs précalculés du store partagé
+    dataset = dataset_for(data)
+    index = dataset.index
+    
+    # Restriction facultative des établissements proposés à un rayon autour d'une ville
+    options = index.options
+    with st.expander("📍 Filtrer par distance"):
+        nearby = _distance_filter(dataset, "prediction")
+    if nearby is not None:
+        nearby = set(nearby.tolist())
+        options = tuple(label for label in options if index.position(label) in nearby)
+        if not options:
+            st.info("Aucun établissement dans ce rayon : tous les établissements restent proposés.")
+            options = index.options
+
+    # Recherche tolérante (accents, fautes de frappe) sur le nom, la ville, le département et l'académie
+    query = st.text_input("🔎 Rechercher un établissement",
+                          placeholder="Nom, ville, département ou académie (ex. « grenoble », « iut lyon »)",
+                          key="prediction_search")
+    if query.strip():
+        allowed = set(options)
+        matches = tuple(label for label in search_labels(dataset, query) if label in allowed)
+        if matches:
+            options = matches
+        else:
+            st.info("Aucun établissement ne correspond à cette recherche : tous les établissements restent proposés.")
+
     # Selection interface
     col1, col2 = st.columns(2)
     
     with col1:
-        iut_choice = st.selectbox("Choisissez votre IUT cible", data['g_ea_lib_vx'].unique())
+        iut_choice = st.selectbox("Choisissez votre IUT cible", options)
         bac_type = st.selectbox("Type de Bac/Diplôme", ["DAEU", "Général", "Technologique"])
     
     with col2:
         mention = st.selectbox("Mention", ["Sans mention", "AB", "B", "TB"])
         boursier = st.checkbox("Je suis boursier", help="Cochez si vous êtes boursier")
+        model = st.selectbox("Modèle de calcul", options=available_models(dataset), format_func=MODEL_LABELS.get,
+                             key="prediction_model")
 
     profile = {
         'bac_type': bac_type,
@@ -269,10 +413,15 @@ def display_prediction_interface(data, show_title=True):
     }
 
     # Get IUT data
-    iut_data = data[data['g_ea_lib_vx'] == iut_choice].iloc[0]
+    position = index.position(iut_choice)
+    iut_data = data.iloc[position]
+    metrics = dataset.metrics_row(position)
     
     # Calculate probability
-    probability, stats = calculate_admission_probability(iut_data, profile)
+    probability, stats = calculate_admission_probability(iut_data, profile, metrics)
+    if model != HEURISTIC_MODEL:
+        # Probabilité du modèle choisi ; les statistiques restent celles de l'établissement
+        probability = model_probabilities(dataset, [profile], model)[0, position]
     
     # Affichage résultats
     col1, col2 = st.columns(2)
@@ -319,11 +468,10 @@ def display_prediction_interface(data, show_title=True):
     col1, col2 = st.columns(2)
     
     with col1:
-        # Calculate percentage distributions
-        total_prop = iut_data['prop_tot_bg'] + iut_data['prop_tot_bt'] + iut_data['prop_tot_at']
-        pct_bg = round((iut_data['prop_tot_bg'] / total_prop * 100), 1) if total_prop > 0 else 0
-        pct_bt = round((iut_data['prop_tot_bt'] / total_prop * 100), 1) if total_prop > 0 else 0
-        pct_at = round((iut_data['prop_tot_at'] / total_prop * 100), 1) if total_prop > 0 else 0
+        # Percentage distributions (précalculées au chargement)
+        pct_bg = round(metrics['part_prop_bg'], 1)
+        pct_bt = round(metrics['part_prop_bt'], 1)
+        pct_at = round(metrics['part_prop_at'], 1)
         
         st.markdown(f"""
         #### 📈 Statistiques de l'établissement
@@ -349,6 +497,57 @@ def display_prediction_interface(data, show_title=True):
         """)
 
     return iut_choice, probability  # Retourne à la fois l'IUT choisi et la probabilité
+def display_formation_trends(data, iut_choice):
+    """Affiche l'évolution d'une formation sur les sessions disponibles et la pression projetée"""
+    store = get_partitioned_store()
+    if len(store.sessions()) < 2 or iut_choice is None:
+        return
+    try:
+        tables = trend_tables(store)
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des sessions: {e}")
+        return
+
+    with st.expander("📈 Évolution sur plusieurs sessions"):
+        code = dataset_for(data).row(iut_choice).get('cod_aff_form')
+        position = tables.position(code)
+        if position is None:
+            st.info(f"Cette formation ne figure pas dans la session {tables.sessions[-1]}.")
+            return
+        history = tables.history(position)
+
+        # Dernière évolution de chaque indicateur
+        columns = st.columns(len(TREND_MEASURES))
+        for column, (name, label) in zip(columns, TREND_MEASURES.items()):
+            value, delta = history[name].iat[-1], history[f'evolution_{name}'].iat[-1]
+            # Effectifs en nombres entiers et évolution en %, taux en points
+            counts = name in ('capacite', 'voeux')
+            column.metric(label, "—" if pd.isna(value) else f"{value:,.0f}" if counts else f"{value:,.1f}",
+                          None if pd.isna(delta) else f"{delta:+.1f}{' %' if counts else ''}")
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=history['session'], y=history['taux_pression'],
+                                 mode='lines+markers', name="Taux de pression"))
+        projected = tables.projected_pressure[position]
+        if not np.isnan(projected):
+            last = history['taux_pression'].dropna()
+            fig.add_trace(go.Scatter(
+                x=[history['session'].iat[last.index[-1]], tables.next_session],
+                y=[last.iat[-1], projected],
+                mode='lines+markers', line=dict(dash='dash'),
+                name=f"Projection {tables.next_session}"
+            ))
+        fig.update_layout(height=350, margin=dict(t=20, b=20), xaxis_title="Session",
+                          yaxis_title="Vœux par place", xaxis_type='category')
+        st.plotly_chart(fig, use_container_width=True)
+
+        labels = {'session': "Session", **TREND_MEASURES}
+        st.dataframe(history[list(labels)].rename(columns=labels).round(2), hide_index=True,
+                     use_container_width=True)
+        if not np.isnan(projected):
+            st.caption(f"Projection {tables.next_session} : droite des moindres carrés sur les sessions "
+                       f"connues, {projected:.1f} vœux par place.")
+
 def display_conseils(sorted_df=None):
     """Affiche les conseils pour la candidature en utilisant les composants natifs Streamlit"""
     
@@ -419,6 +618,8 @@ def display_global_interface(data):
     
     with col3:
         boursier = st.checkbox("Boursier", key="global_boursier")
+        model = st.selectbox("Modèle de calcul", options=available_models(dataset_for(data)),
+                             format_func=MODEL_LABELS.get, key="global_model")
 
     profile = {
         'bac_type': bac_type,
@@ -426,7 +627,73 @@ def display_global_interface(data):
         'boursier': boursier
     }
     
-    results_df = calculate_chances(profile, data)
+    # Filtres appliqués par index (aucun tri de l'ensemble des formations)
+    dataset = dataset_for(data)
+    index = filter_index(dataset)
+
+    # Lieu de départ facultatif : classement mêlant chances et distance
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        home = st.text_input("Votre commune ou vos coordonnées (lat, lon)", key="global_home")
+    with col2:
+        distance_weight = st.slider("Poids de la distance", min_value=0.0, max_value=1.0, value=0.5, step=0.05,
+                                    key="global_distance_weight")
+    place = None
+    if home.strip():
+        candidates = gazetteer_for(dataset).candidates(home)
+        if not candidates:
+            # Sans gazetier construit, seules les villes des formations sont connues
+            hint = "" if DEFAULT_GAZETTEER.exists() else " (seules les villes des formations sont connues)"
+            st.warning(f"Commune introuvable : {home}{hint}")
+        if len(candidates) == 1:
+            place = candidates[0]
+        elif candidates:
+            # Saisie ambiguë (homonymes, préfixe partagé) : l'utilisateur choisit
+            place = st.selectbox("Plusieurs communes correspondent, précisez laquelle", candidates,
+                                 format_func=lambda entry: f"{entry['nom']} ({entry['departement']})",
+                                 key="global_home_choice")
+    if place is not None:
+        st.caption(f"Distances calculées depuis {place['nom']} ({place['lat']:.3f}, {place['lon']:.3f})")
+    distances = None if place is None else distances_from(dataset, place['lat'], place['lon'])
+    with st.expander("Filtres"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            regions = st.multiselect("Région", options=index.options('region'), key="global_region")
+            min_capacity = st.number_input("Capacité minimale", min_value=0, value=0, step=5,
+                                           key="global_min_capacity")
+        with col2:
+            academies = st.multiselect("Académie", options=index.options('academie'), key="global_academie")
+            max_pressure = st.number_input("Taux de pression maximal (0 : sans limite)", min_value=0.0,
+                                           value=0.0, step=1.0, key="global_max_pressure")
+        with col3:
+            departements = st.multiselect("Département", options=index.options('departement'),
+                                          key="global_departement")
+            top_k = st.number_input("Nombre d'établissements affichés", min_value=1,
+                                    max_value=max(len(data), 1), value=max(min(DEFAULT_TOP_K, len(data)), 1),
+                                    key="global_top_k")
+        nearby = _distance_filter(dataset, "global")
+
+    filters = {
+        'region': regions,
+        'academie': academies,
+        'departement': departements,
+        'min_capacity': min_capacity or None,
+        'max_pressure': max_pressure or None,
+        'positions': nearby
+    }
+    scores = None
+    if distances is not None:
+        chances, _ = profile_chances(dataset, profile, model)
+        scores = combined_scores(chances, distances, distance_weight)
+    positions, chances = recommend(dataset, profile, int(top_k), values=scores, model=model, **filters)
+    mask = index.mask(**filters)
+    if not len(positions):
+        st.info("Aucun établissement ne correspond à ces filtres.")
+        return
+
+    # Statistiques sur toutes les formations filtrées, graphique sur les k meilleures
+    selected_df = _results_table(dataset, chances, None if mask is None else mask.nonzero()[0])
+    results_df = _results_table(dataset, chances, positions, distances, scores)
     
     # Statistiques globales
     st.subheader("Statistiques générales")
@@ -435,22 +702,22 @@ def display_global_interface(data):
     with col1:
         st.metric(
             "Capacité moyenne",
-            f"{int(results_df['capacite'].mean())}"
+            f"{int(selected_df['capacite'].mean())}"
         )
     with col2:
         st.metric(
             "Candidats moyens/IUT",
-            f"{int(results_df['nb_candidats'].mean())}"
+            f"{int(selected_df['nb_candidats'].mean())}"
         )
     with col3:
         st.metric(
             "Chance moyenne",
-            f"{results_df['chances'].mean():.1f}%"
+            f"{selected_df['chances'].mean():.1f}%"
         )
     with col4:
         st.metric(
             "Taux boursiers moyen",
-            f"{results_df['pct_boursiers'].mean():.1f}%"
+            f"{selected_df['pct_boursiers'].mean():.1f}%"
         )
     
     # Graphique
@@ -469,7 +736,8 @@ def display_global_interface(data):
             'region': True,
             'capacite': ':,.0f',
             'nb_candidats': ':,.0f',
-            'pct_boursiers': ':.1f%'
+            'pct_boursiers': ':.1f%',
+            **({'distance_km': ':,.0f'} if distances is not None else {})
         }
     )
 
@@ -505,11 +773,15 @@ def display_global_interface(data):
     st.plotly_chart(fig, use_container_width=True)
     
     # Tableau des résultats
-    sorted_df = results_df.copy()
+    sort_options = ['chances', 'capacite', 'nb_candidats', 'pct_boursiers']
+    if distances is not None:
+        sort_options = ['score', 'distance_km'] + sort_options
     sort_column = st.selectbox(
         "Trier par",
-        options=['chances', 'capacite', 'nb_candidats', 'pct_boursiers'],
+        options=sort_options,
         format_func=lambda x: {
+            'score': 'Score (chances et distance)',
+            'distance_km': 'Distance',
             'chances': 'Probabilité',
             'capacite': 'Capacité',
             'nb_candidats': 'Nombre de candidats',
@@ -517,15 +789,142 @@ def display_global_interface(data):
         }[x]
     )
     
-    sorted_df = sorted_df.sort_values(sort_column, ascending=False)
+    if sort_column == ('chances' if distances is None else 'score'):
+        # Déjà classé pour le graphique : pas de second tri
+        sorted_df = results_df
+    else:
+        # k premières formations selon la colonne choisie, par sélection partielle
+        if sort_column == 'chances':
+            values = chances
+        elif sort_column == 'distance_km':
+            values = -distances
+        else:
+            values = dataset.cached('comparison_table', _comparison_table)[sort_column].to_numpy(dtype=float)
+        top, _ = recommend(dataset, profile, int(top_k), values=values, model=model, **filters)
+        sorted_df = _results_table(dataset, chances, top, distances, scores)
     
     # Afficher le tableau une seule fois avec le formatage
     st.dataframe(sorted_df.style.format({
         'capacite': '{:,.0f}',
         'nb_candidats': '{:,.0f}',
         'chances': '{:.1f}%',
-        'pct_boursiers': '{:.1f}%'
-    }))
+        'pct_boursiers': '{:.1f}%',
+        'distance_km': '{:,.0f} km',
+        'score': '{:.2f}'
+    }, subset=[column for column in sorted_df.columns if column in (
+        'capacite', 'nb_candidats', 'chances', 'pct_boursiers', 'distance_km', 'score')]))
+
+def display_voeux_optimiser(dataset, profile, model=HEURISTIC_MODEL):
+    """Proposition d'une liste de vœux qui maximise les chances d'au moins une proposition"""
+    with st.expander("🧭 Me proposer une liste de vœux"):
+        cities = dataset.cached('city_coordinates', lambda dataset: city_coordinates(dataset.frame))
+        regions = filter_index(dataset).options('region')
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            k = st.number_input("Nombre de vœux", min_value=1, max_value=MAX_VOEUX, value=MAX_VOEUX,
+                                key="optim_k")
+            region = st.multiselect("Région", options=regions, key="optim_region")
+        with col2:
+            city = st.selectbox("Ville de référence", options=["(aucune)"] + sorted(cities, key=str.casefold),
+                                key="optim_city")
+            max_km = st.number_input("Distance maximale (km)", min_value=10, value=300, step=10,
+                                     key="optim_max_km")
+        with col3:
+            min_selective = st.number_input("Formations sélectives (minimum)", min_value=0,
+                                            max_value=MAX_VOEUX, value=0, key="optim_selective")
+            min_open = st.number_input("Formations moins sélectives (minimum)", min_value=0,
+                                       max_value=MAX_VOEUX, value=0, key="optim_open")
+
+        if min_selective + min_open > k:
+            st.warning("Les minimums de sélectivité dépassent le nombre de vœux.")
+            return
+        origin = cities.get(city)
+        plan = optimise_voeux(dataset, profile, int(k), origin=origin, max_km=max_km if origin else None,
+                              min_selective=int(min_selective), min_open=int(min_open), model=model,
+                              region=region)
+        if not len(plan.positions):
+            st.info("Aucune formation ne respecte ces contraintes.")
+            return
+
+        st.metric("Au moins une proposition", f"{plan.p_any * 100:.1f}%")
+        table = dataset.cached('comparison_table', _comparison_table).take(plan.positions)
+        table.insert(5, 'chances', np.round(plan.probabilities * 100, 1))
+        st.dataframe(table.style.format({
+            'capacite': '{:,.0f}',
+            'nb_candidats': '{:,.0f}',
+            'chances': '{:.1f}%',
+            'pct_boursiers': '{:.1f}%'
+        }), hide_index=True)
+
+def display_voeux_simulation(data):
+    """Simulation d'une liste complète de vœux"""
+    st.subheader("Simuler ma liste de vœux")
+
+    dataset = dataset_for(data)
+    index = dataset.index
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        bac_type = st.selectbox("Type de Bac", options=["Général", "Technologique", "DAEU"], key="voeux_bac")
+    with col2:
+        mention = st.selectbox("Mention au Bac", options=["Sans mention", "AB", "B", "TB"], key="voeux_mention")
+    with col3:
+        boursier = st.checkbox("Boursier", key="voeux_boursier")
+        model = st.selectbox("Modèle de calcul", options=available_models(dataset), format_func=MODEL_LABELS.get,
+                             key="voeux_model")
+
+    profile = {
+        'bac_type': bac_type,
+        'mention': mention,
+        'boursier': boursier
+    }
+
+    display_voeux_optimiser(dataset, profile, model)
+
+    voeux = st.multiselect(
+        f"Vos vœux, par ordre de préférence ({MAX_VOEUX} maximum)",
+        options=index.options,
+        max_selections=MAX_VOEUX,
+        key="voeux_liste"
+    )
+    if not voeux:
+        st.info("Choisissez au moins un établissement pour lancer la simulation.")
+        return
+
+    positions = [index.position(label) for label in voeux]
+    probabilities = profile_probabilities(dataset, profile, positions, model)
+    # Graine fixe : le résultat ne change pas d'une interaction à l'autre
+    result = simulate_voeux(probabilities, DEFAULT_DRAWS, seed=0)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Au moins une proposition", f"{result.p_any * 100:.1f}%")
+    with col2:
+        st.metric("Propositions attendues", f"{result.expected_offers:.2f}")
+    with col3:
+        st.metric("Aucune proposition", f"{result.offers_distribution[0] * 100:.1f}%")
+
+    best_df = pd.DataFrame({
+        'voeu': [f"{rank}. {label}" for rank, label in enumerate(voeux, start=1)],
+        'chances': probabilities * 100,
+        'meilleure_proposition': result.best_offer_distribution * 100
+    })
+    fig = px.bar(
+        best_df,
+        x='voeu',
+        y='meilleure_proposition',
+        title=f'Meilleure proposition reçue ({DEFAULT_DRAWS} tirages)',
+        labels={'meilleure_proposition': 'Probabilité (%)', 'voeu': 'Vœu'},
+        hover_data={'chances': ':.1f'}
+    )
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font={'color': 'white', 'size': 12}
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
 def main():
     """Main function for standalone testing"""
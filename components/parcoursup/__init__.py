@@ -0,0 +1 @@
+# Fichier intentionnellement vide pour marquer le dossier comme un package Python
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""Calcul des chances pour une cohorte de candidats, en ligne de commande.
+
+Le fichier d'entrée (CSV ou JSONL) contient une ligne par candidat avec les
+colonnes `bac_type`, `mention`, `boursier` et, optionnellement, `candidat`
+(identifiant). La sortie contient une ligne par candidat et par formation.
+
+    python -m components.parcoursup.batch cohorte.csv -o scores.csv --workers 4
+
+Les candidats sont traités par blocs dans un pool de processus ; chaque
+processus charge le jeu de données une fois (pages du snapshot partagées) et
+lit les probabilités dans le cube précalculé. Le nombre de blocs en cours est
+borné : la mémoire ne dépend pas de la taille de la cohorte.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.cube import profile_in_cube, profile_position
+from components.parcoursup.loading import LOAD_MODES, open_store
+from components.parcoursup.scoring import score_profiles
+
+# Nombre maximal de cellules (candidats × formations) calculées par bloc
+DEFAULT_CELLS_PER_CHUNK = 2_000_000
+OUTPUT_COLUMNS = ['candidat', 'cod_aff_form', 'etablissement', 'chances']
+
+TRUE_VALUES = {'1', 'true', 'vrai', 'oui', 'yes', 'o', 'y'}
+
+# Store du processus de calcul, ouvert une fois par processus
+_worker_store = None
+
+def parse_boursier(values):
+    """Convertit la colonne boursier (booléens, 0/1, oui/non...) en booléens"""
+    return values.map(lambda value: str(value).strip().lower() in TRUE_VALUES)
+
+def read_profiles(path, chunk_size):
+    """Lit les profils par blocs depuis un fichier CSV ou JSONL"""
+    path = Path(path)
+    if path.suffix.lower() in ('.jsonl', '.ndjson', '.json'):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+    offset = 0
+    for chunk in reader:
+        chunk = chunk.reset_index(drop=True)
+        if 'candidat' not in chunk.columns:
+            chunk['candidat'] = np.arange(offset, offset + len(chunk))
+        chunk['boursier'] = parse_boursier(chunk['boursier'])
+        offset += len(chunk)
+        yield chunk
+
+def _init_worker(mode):
+    global _worker_store
+    _worker_store = open_store(mode)
+
+def probability_block(dataset, profiles):
+    """Chances (profils × formations) d'un bloc, lues dans le cube quand c'est possible"""
+    records = profiles[['bac_type', 'mention', 'boursier']].to_dict('records')
+    in_cube = np.array([profile_in_cube(profile) for profile in records], dtype=bool)
+
+    chances = np.empty((len(records), len(dataset.frame)), dtype=np.float64)
+    if in_cube.any():
+        positions = [profile_position(profile) for profile, kept in zip(records, in_cube) if kept]
+        chances[in_cube] = dataset.cube.chances[positions]
+    if (~in_cube).any():
+        others = [profile for profile, kept in zip(records, in_cube) if not kept]
+        chances[~in_cube] = np.round(score_profiles(others, dataset.metrics).probabilities, 1)
+    return chances
+
+def score_chunk(profiles, output_format, top_k=None, min_chances=None):
+    """Calcule un bloc de candidats dans un processus du pool et retourne la sortie encodée"""
+    dataset = _worker_store.get()
+    chances = probability_block(dataset, profiles)
+    formations = len(dataset.frame)
+
+    if top_k is not None and top_k < formations:
+        # Sélection partielle des k meilleures formations par candidat (sans tri complet)
+        columns = np.argpartition(-chances, top_k - 1, axis=1)[:, :top_k]
+    else:
+        columns = np.broadcast_to(np.arange(formations), chances.shape)
+    rows = np.repeat(np.arange(len(profiles)), columns.shape[1])
+    columns = columns.ravel()
+    values = chances[rows, columns]
+
+    if min_chances is not None:
+        kept = values >= min_chances
+        rows, columns, values = rows[kept], columns[kept], values[kept]
+
+    frame = dataset.frame
+    keys = frame['cod_aff_form'].to_numpy() if 'cod_aff_form' in frame.columns else np.arange(formations)
+    output = pd.DataFrame({
+        'candidat': profiles['candidat'].to_numpy()[rows],
+        'cod_aff_form': keys[columns],
+        'etablissement': frame['g_ea_lib_vx'].to_numpy()[columns],
+        'chances': values
+    }, columns=OUTPUT_COLUMNS)
+
+    if output_format == 'csv':
+        return len(profiles), len(output), output.to_csv(index=False, header=False)
+    return len(profiles), len(output), output
+
+class _ParquetOutput:
+    """Écriture incrémentale en Parquet (pyarrow, dépendance optionnelle)"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("La sortie Parquet nécessite pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._pq = pq
+        self._path = path
+        self._writer = None
+
+    def write(self, frame):
+        table = self._pa.Table.from_pandas(frame, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def run_batch(source, output, mode="auto", workers=None, top_k=None, min_chances=None,
+              cells_per_chunk=DEFAULT_CELLS_PER_CHUNK):
+    """Calcule toute la cohorte et écrit la sortie ; retourne (candidats, lignes écrites)"""
+    if top_k is not None and top_k < 1:
+        raise ValueError(f"top_k doit être au moins 1: {top_k}")
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    formations = max(len(open_store(mode).get().frame), 1)
+    chunk_size = max(1, cells_per_chunk // formations)
+    output = Path(output)
+    output_format = 'parquet' if output.suffix.lower() == '.parquet' else 'csv'
+
+    profiles_done = rows_written = 0
+    if output_format == 'csv':
+        sink = open(output, 'w', encoding='utf-8', newline='')
+        sink.write(','.join(OUTPUT_COLUMNS) + '\n')
+    else:
+        sink = _ParquetOutput(output)
+
+    def consume(future):
+        nonlocal profiles_done, rows_written
+        done, rows, payload = future.result()
+        sink.write(payload)
+        profiles_done += done
+        rows_written += rows
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(mode,)) as pool:
+            pending = []
+            for profiles in read_profiles(source, chunk_size):
+                pending.append(pool.submit(score_chunk, profiles, output_format, top_k, min_chances))
+                # Blocs en cours bornés : la sortie est écrite dans l'ordre d'entrée
+                while len(pending) >= workers * 2:
+                    consume(pending.pop(0))
+            for future in pending:
+                consume(future)
+    finally:
+        sink.close()
+    return profiles_done, rows_written
+
+def positive_int(text):
+    """Entier strictement positif pour argparse"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"entier attendu: {text}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"doit être au moins 1: {value}")
+    return value
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Calcule les chances d'une cohorte de candidats")
+    parser.add_argument('source', type=Path, help="profils candidats (.csv ou .jsonl)")
+    parser.add_argument('-o', '--output', type=Path, required=True, help="fichier de sortie (.csv ou .parquet)")
+    parser.add_argument('--mode', choices=LOAD_MODES, default="auto", help="mode de chargement des données")
+    parser.add_argument('--workers', type=positive_int, default=None, help="nombre de processus")
+    parser.add_argument('--top-k', type=positive_int, default=None, help="ne garder que les k meilleures formations par candidat")
+    parser.add_argument('--min-chances', type=float, default=None, help="ne garder que les chances >= ce seuil (%%)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    profiles, rows = run_batch(args.source, args.output, args.mode, args.workers, args.top_k, args.min_chances)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{profiles:,} candidats, {rows:,} lignes écrites dans {args.output} en {elapsed:.2f} s "
+          f"({profiles / elapsed:,.0f} candidats/s, {rows / elapsed:,.0f} lignes/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
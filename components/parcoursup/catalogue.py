@@ -0,0 +1,101 @@
+"""Mode catalogue : l'export complet, toutes filières confondues.
+
+Des index inversés sur les champs de filière (`fili`, `lib_for_voe_ins`,
+`form_lib_voe_acc`, `select_form`, `contrat_etab`) sont construits une fois par
+version : pour chaque valeur, les positions triées des formations qui la
+portent. Choisir une filière revient à intersecter quelques tableaux de
+positions puis à découper le DataFrame, les indicateurs et le cube par
+position (`Dataset.take`) ; chaque restriction est gardée en mémoire pour
+que revenir à une filière déjà vue soit immédiat.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+CATALOGUE_FIELDS = ('fili', 'lib_for_voe_ins', 'form_lib_voe_acc', 'select_form', 'contrat_etab')
+# Restrictions gardées en mémoire par version (les plus récemment utilisées)
+MAX_SLICES = 16
+
+class CatalogueIndex:
+    """Index inversés valeur -> positions triées des formations, pour chaque champ de filière"""
+
+    def __init__(self, frame):
+        self.size = len(frame)
+        self.values = {}
+        self.codes = {}
+        self.postings = {}
+        for field in CATALOGUE_FIELDS:
+            if field not in frame.columns:
+                continue
+            series = frame[field]
+            if not hasattr(series, 'cat'):
+                series = series.astype('category')
+            codes = series.cat.codes.to_numpy(dtype=np.int64)
+            categories = list(series.cat.categories)
+            # Positions regroupées par code (tri stable : positions croissantes dans chaque groupe)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1), side='left')
+            self.values[field] = categories
+            self.codes[field] = codes
+            self.postings[field] = {
+                value: order[bounds[code]:bounds[code + 1]]
+                for code, value in enumerate(categories)
+                if bounds[code + 1] > bounds[code]
+            }
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Construit les index d'une version du jeu de données"""
+        return cls(dataset.frame)
+
+    def options(self, field, positions=None):
+        """Valeurs d'un champ présentes parmi `positions` (toutes les formations si None), triées"""
+        if field not in self.codes:
+            return []
+        codes = self.codes[field] if positions is None else self.codes[field][positions]
+        present = np.unique(codes[codes >= 0])
+        return sorted((self.values[field][code] for code in present), key=str.casefold)
+
+    def positions(self, **selection):
+        """Positions triées des formations qui portent toutes les valeurs demandées (None : pas de filtre)"""
+        selected = []
+        for field, value in selection.items():
+            if value is None:
+                continue
+            if field not in self.postings:
+                raise KeyError(f"Champ de catalogue inconnu: {field}")
+            selected.append(self.postings[field].get(value, np.empty(0, dtype=np.int64)))
+        if not selected:
+            return np.arange(self.size)
+        # Intersection en partant de la liste la plus courte
+        selected.sort(key=len)
+        positions = selected[0]
+        for other in selected[1:]:
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+def catalogue_index(dataset):
+    """Index du catalogue de la version, partagés par toutes les sessions"""
+    return dataset.cached('catalogue_index', CatalogueIndex.from_dataset)
+
+_slices_lock = threading.Lock()
+
+def filiere_dataset(dataset, **selection):
+    """Dataset restreint à une sélection de filière, découpé une fois puis réutilisé"""
+    selection = {field: value for field, value in selection.items() if value is not None}
+    if not selection:
+        return dataset
+    key = tuple(sorted(selection.items()))
+    slices = dataset.cached('catalogue_slices', lambda dataset: OrderedDict())
+    with _slices_lock:
+        subset = slices.get(key)
+        if subset is not None:
+            slices.move_to_end(key)
+            return subset
+    subset = dataset.take(catalogue_index(dataset).positions(**selection))
+    with _slices_lock:
+        slices[key] = subset
+        while len(slices) > MAX_SLICES:
+            slices.popitem(last=False)
+    return subset
@@ -0,0 +1,156 @@
+"""Nettoyage reproductible de l'export national Parcoursup (CSV open data).
+
+Le fichier brut (≈ 14 000 formations, ≈ 120 colonnes, séparateur `;`) doit être
+exporté avec les noms de champs en en-tête (option `use_labels=false` de la
+plateforme open data), c'est-à-dire les mêmes clés que l'export JSON.
+
+Le fichier est lu par blocs ; chaque bloc est filtré (fili / lib_for_voe_ins)
+et normalisé dans un pool de processus, avec un nombre borné de blocs en
+cours pour tenir dans un budget mémoire fixe. Le résultat est écrit en JSON
+(`--json`) et sous forme de snapshot colonnaire à côté, marqué de l'empreinte
+de ce JSON : `load_data` en mode auto le sert directement.
+
+    python -m components.parcoursup.cleaning fr-esr-parcoursup.csv \\
+        --fili BUT --formation "BUT - Science des données" --memory-mb 512 \\
+        --json .data/parcoursup.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.schema import GEO_COLUMN, LABEL_COLUMNS, apply_schema, is_count_column
+from components.parcoursup.snapshot import write_snapshot
+from components.parcoursup.store import file_digest
+
+DEFAULT_FILI = ('BUT',)
+DEFAULT_FORMATIONS = ('BUT - Science des données',)
+DEFAULT_MEMORY_MB = 512
+
+# Facteur entre la taille d'une ligne sur disque et son coût en mémoire une fois
+# chargée en chaînes Python par pandas
+IN_MEMORY_FACTOR = 12
+
+def parse_coordinates(values):
+    """Convertit la colonne « lat, lon » de l'export CSV en deux tableaux float32"""
+    parts = values.fillna('').str.split(',', n=1)
+    lat = pd.to_numeric(parts.str[0].str.strip(), errors='coerce').to_numpy(dtype=np.float32)
+    lon = pd.to_numeric(parts.str[1].str.strip(), errors='coerce').to_numpy(dtype=np.float32)
+    return lat, lon
+
+def clean_chunk(chunk, fili=None, formations=None):
+    """Filtre et normalise un bloc de lignes brutes (toutes les colonnes lues en texte)"""
+    mask = pd.Series(True, index=chunk.index)
+    if fili and 'fili' in chunk.columns:
+        mask &= chunk['fili'].str.strip().isin(fili)
+    if formations and 'lib_for_voe_ins' in chunk.columns:
+        mask &= chunk['lib_for_voe_ins'].str.strip().isin(formations)
+    chunk = chunk.loc[mask]
+    if chunk.empty:
+        return chunk
+
+    columns = {}
+    for column in chunk.columns:
+        values = chunk[column].str.strip().replace('', np.nan)
+        if column == GEO_COLUMN:
+            columns['lat'], columns['lon'] = parse_coordinates(values)
+        elif is_count_column(column):
+            columns[column] = pd.to_numeric(values, errors='coerce')
+        else:
+            # Codes et libellés restent du texte, comme dans l'export JSON
+            columns[column] = values
+    return pd.DataFrame(columns, index=chunk.index)
+
+def estimate_chunk_rows(path, memory_bytes, in_flight):
+    """Nombre de lignes par bloc pour que `in_flight` blocs tiennent dans le budget mémoire"""
+    with open(path, 'rb') as file:
+        sample = file.read(1 << 20)
+    lines = max(sample.count(b'\n') - 1, 1)
+    bytes_per_row = max(len(sample) / lines, 1) * IN_MEMORY_FACTOR
+    return max(int(memory_bytes / (in_flight * bytes_per_row)), 100)
+
+def run_pipeline(source, fili=DEFAULT_FILI, formations=DEFAULT_FORMATIONS,
+                 memory_mb=DEFAULT_MEMORY_MB, workers=None, encoding='utf-8'):
+    """Nettoie le CSV brut et retourne le DataFrame compact des formations retenues"""
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    # Blocs en mémoire en même temps : celui en lecture, ceux en traitement et en attente
+    in_flight = workers * 2 + 1
+    chunk_rows = estimate_chunk_rows(source, memory_mb * 1024 * 1024, in_flight)
+
+    reader = pd.read_csv(source, sep=';', dtype=str, keep_default_na=False,
+                         encoding=encoding, chunksize=chunk_rows)
+    kept = []
+    rows_read = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in reader:
+            rows_read += len(chunk)
+            pending.append(pool.submit(clean_chunk, chunk, fili, formations))
+            # Attendre le bloc le plus ancien avant d'en lire d'autres : mémoire bornée
+            while len(pending) >= in_flight - 1:
+                kept.append(pending.pop(0).result())
+        kept.extend(future.result() for future in pending)
+
+    kept = [frame for frame in kept if len(frame)]
+    frame = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame()
+    if len(frame):
+        for column in LABEL_COLUMNS:
+            if column in frame.columns:
+                frame[column] = frame[column].astype('category')
+    return apply_schema(frame), rows_read
+
+def to_export_records(frame):
+    """Reconstruit les enregistrements au format de l'export JSON (géolocalisation en dict)"""
+    records = json.loads(frame.to_json(orient='records', force_ascii=False))
+    for record in records:
+        lat, lon = record.pop('lat', None), record.pop('lon', None)
+        record[GEO_COLUMN] = {'lon': lon, 'lat': lat} if lat is not None and lon is not None else None
+    return records
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Nettoie l'export national Parcoursup (CSV)")
+    parser.add_argument('source', type=Path, help="fichier CSV brut (séparateur ;)")
+    parser.add_argument('--fili', nargs='*', default=list(DEFAULT_FILI),
+                        help="filières à garder (vide : toutes)")
+    parser.add_argument('--formation', nargs='*', default=list(DEFAULT_FORMATIONS),
+                        help="valeurs de lib_for_voe_ins à garder (vide : toutes)")
+    parser.add_argument('--memory-mb', type=int, default=DEFAULT_MEMORY_MB,
+                        help="budget mémoire des blocs en cours de traitement")
+    parser.add_argument('--workers', type=int, default=None, help="nombre de processus")
+    parser.add_argument('--encoding', default='utf-8')
+    parser.add_argument('--snapshot', type=Path, default=None,
+                        help="dossier du snapshot produit (par défaut, à côté de l'export --json)")
+    parser.add_argument('--json', type=Path, default=None,
+                        help="écrit aussi un export JSON au format de .data/parcoursup.json")
+    args = parser.parse_args(argv)
+    if args.json is None and args.snapshot is None:
+        parser.error("indiquez --json et/ou --snapshot")
+
+    start = time.perf_counter()
+    frame, rows_read = run_pipeline(args.source, args.fili, args.formation,
+                                    args.memory_mb, args.workers, args.encoding)
+    snapshot_dir = args.snapshot
+    if args.json is not None:
+        records = to_export_records(frame)
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'total_count': len(records), 'results': records}, file, ensure_ascii=False, indent=4)
+        # Snapshot marqué de l'empreinte du JSON écrit : le mode "auto" de load_data le juge à jour
+        source_digest = file_digest(args.json)
+        snapshot_dir = snapshot_dir or args.json.with_suffix('.snapshot')
+    else:
+        # Sans JSON, le snapshot n'est à jour pour aucun export : seul le mode "snapshot" le sert
+        source_digest = file_digest(args.source)
+    manifest_path = write_snapshot(frame, snapshot_dir, source_digest=source_digest)
+
+    elapsed = time.perf_counter() - start
+    print(f"{rows_read:,} lignes lues, {len(frame):,} formations gardées en {elapsed:.1f} s")
+    print(f"Snapshot écrit: {manifest_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.scoring import BAC_TYPES, MENTIONS, score_profiles
+
+# Les 24 profils possibles de l'interface : 3 types de bac × 4 mentions × boursier ou non
+ALL_PROFILES = tuple(
+    {'bac_type': bac_type, 'mention': mention, 'boursier': boursier}
+    for bac_type, mention, boursier in product(BAC_TYPES, MENTIONS, (False, True))
+)
+PROFILE_POSITIONS = {
+    (profile['bac_type'], profile['mention'], profile['boursier']): position
+    for position, profile in enumerate(ALL_PROFILES)
+}
+
+def profile_position(profile):
+    """Position d'un profil dans le cube (KeyError pour un profil hors de l'interface)"""
+    return PROFILE_POSITIONS[(profile['bac_type'], profile['mention'], bool(profile['boursier']))]
+
+def profile_in_cube(profile):
+    """Indique si le profil fait partie des 24 combinaisons précalculées"""
+    return (profile['bac_type'], profile['mention'], bool(profile['boursier'])) in PROFILE_POSITIONS
+
+def rank_chances(chances):
+    """Positions des formations par chances décroissantes, pour chaque profil (ligne)"""
+    # Même tri que sort_values('chances', ascending=False) pour garder l'ordre des ex aequo
+    return np.vstack([
+        pd.Series(row).sort_values(ascending=False).index.to_numpy()
+        for row in chances
+    ]) if len(chances) else np.empty((0, 0), dtype=np.int64)
+
+class ProbabilityCube:
+    """Probabilités et classements des 24 profils pour toutes les formations d'une version.
+
+    - `probabilities` : tableau (24 × formations) issu du noyau de calcul
+    - `chances` : mêmes valeurs arrondies à 0,1 comme dans les tableaux affichés
+    - `orderings` : pour chaque profil, positions des formations par chances décroissantes
+    """
+
+    def __init__(self, metrics):
+        self.probabilities = score_profiles(ALL_PROFILES, metrics).probabilities
+        self.chances = np.round(self.probabilities, 1)
+        self.orderings = rank_chances(self.chances)
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Construit le cube d'une version du jeu de données"""
+        return cls(dataset.metrics)
+
+    def take(self, positions):
+        """Cube restreint aux formations `positions` (triées), renumérotées 0..n-1 sans recalcul des probabilités"""
+        positions = np.asarray(positions, dtype=np.int64)
+        cube = ProbabilityCube.__new__(ProbabilityCube)
+        cube.probabilities = self.probabilities[:, positions]
+        cube.chances = self.chances[:, positions]
+        # Classements refaits sur la restriction : les ex aequo suivent le même tri qu'un tableau filtré
+        cube.orderings = rank_chances(cube.chances)
+        return cube
+
+    def spliced(self, metrics, reuse):
+        """Cube de la version suivante : colonnes des lignes reprises recopiées, lignes nouvelles calculées
+
+        reuse : pour chaque formation de `metrics`, sa position dans ce cube (-1 si ajoutée ou modifiée).
+        """
+        reuse = np.asarray(reuse, dtype=np.int64)
+        kept = np.flatnonzero(reuse >= 0)
+        fresh = np.flatnonzero(reuse < 0)
+        cube = ProbabilityCube.__new__(ProbabilityCube)
+        cube.probabilities = np.empty((len(ALL_PROFILES), len(reuse)))
+        cube.probabilities[:, kept] = self.probabilities[:, reuse[kept]]
+        if len(fresh):
+            cube.probabilities[:, fresh] = score_profiles(ALL_PROFILES, metrics.iloc[fresh]).probabilities
+        cube.chances = np.round(cube.probabilities, 1)
+        cube.orderings = rank_chances(cube.chances)
+        return cube
+
+    def probability(self, profile, position):
+        """Probabilité d'un profil pour la formation à cette position"""
+        return self.probabilities[profile_position(profile), position]
+
+    def ranking(self, profile):
+        """(positions triées, chances arrondies) d'un profil"""
+        row = profile_position(profile)
+        return self.orderings[row], self.chances[row]
@@ -0,0 +1,236 @@
+"""Mise à jour incrémentale du jeu de données à partir d'un nouvel export.
+
+Les formations sont appariées par `cod_aff_form`. Une ligne identique à une
+ligne de la version précédente est « reprise » : ses indicateurs dérivés, ses
+probabilités du cube et ses entrées d'index sont recopiés depuis l'ancienne
+position. Seules les lignes ajoutées ou modifiées sont recalculées.
+
+Publication d'un export corrigé :
+    python -m components.parcoursup.delta nouvel_export.json [.data/parcoursup.json]
+
+La comparaison se fait avec le snapshot courant (mappé en mémoire, sans relire
+l'ancien JSON). Le nouveau snapshot réutilise les fichiers des colonnes
+inchangées et enregistre, pour chaque ligne, la position reprise dans la
+version précédente : le store de l'application s'en sert pour raccorder la
+nouvelle version sans rien comparer. Il est écrit avant le JSON et désigne le
+JSON qu'il remplace : le mode auto le sert aussitôt, sans repasser par le JSON
+pendant la publication.
+"""
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.metrics import compute_metrics
+from components.parcoursup.schema import apply_schema
+from components.parcoursup.snapshot import MANIFEST_NAME, load_snapshot, read_manifest, snapshot_is_fresh, write_snapshot
+from components.parcoursup.store import DEFAULT_SOURCE, file_digest, read_json_frame
+
+KEY_COLUMN = 'cod_aff_form'
+
+class Delta:
+    """Différences entre deux versions, exprimées en clés cod_aff_form"""
+
+    def __init__(self, added, removed, changed, unchanged):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.unchanged = unchanged
+
+    def __bool__(self):
+        return bool(len(self.added) or len(self.removed) or len(self.changed))
+
+    def summary(self):
+        """Résumé lisible des différences"""
+        return (f"{len(self.added)} ajoutée(s), {len(self.changed)} modifiée(s), "
+                f"{len(self.removed)} supprimée(s), {len(self.unchanged)} inchangée(s)")
+
+class RowPatch:
+    """Correspondance ligne à ligne entre une version et la suivante.
+
+    - `reuse` : pour chaque ligne de la nouvelle version, position de la ligne
+      identique dans l'ancienne (-1 pour une ligne ajoutée ou modifiée)
+    - `changed_columns` : colonnes dont au moins une valeur a changé
+    - `aligned` : mêmes formations dans le même ordre (seules des valeurs changent)
+    """
+
+    def __init__(self, delta, reuse, changed_columns, aligned):
+        self.delta = delta
+        self.reuse = reuse
+        self.changed_columns = changed_columns
+        self.aligned = aligned
+
+    def __bool__(self):
+        return bool(self.delta)
+
+    @property
+    def fresh(self):
+        """Positions (nouvelle version) des lignes à recalculer"""
+        return np.flatnonzero(self.reuse < 0)
+
+def _comparable(series):
+    """Valeurs d'une colonne dans une forme comparable quel que soit le type compact choisi"""
+    if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return series.astype(object).to_numpy()
+
+def _differs(old_values, new_values):
+    """Masque des lignes dont la valeur a changé (deux valeurs manquantes sont égales)"""
+    both_missing = pd.isna(old_values) & pd.isna(new_values)
+    return (old_values != new_values) & ~both_missing
+
+def match_rows(old, new, columns=None, key=KEY_COLUMN):
+    """Compare deux versions du DataFrame des formations, ligne par ligne selon la clé (RowPatch)"""
+    for frame in (old, new):
+        if frame[key].duplicated().any():
+            raise ValueError(f"La clé {key} doit être unique dans chaque export")
+
+    old_keys = old[key].to_numpy()
+    new_keys = new[key].to_numpy()
+    old_positions = pd.Index(old_keys)
+    in_old = old_positions.get_indexer(new_keys)
+
+    common = in_old >= 0
+    new_common = np.flatnonzero(common)
+    old_common = in_old[common]
+
+    if columns is None:
+        columns = sorted(set(old.columns) | set(new.columns))
+    changed = np.zeros(len(new_common), dtype=bool)
+    changed_columns = set()
+    for column in columns:
+        if column == key:
+            continue
+        if column not in old.columns or column not in new.columns:
+            # Colonne apparue ou disparue : toutes les lignes communes changent
+            changed[:] = True
+            changed_columns.add(column)
+            continue
+        differs = _differs(_comparable(old[column])[old_common], _comparable(new[column])[new_common])
+        if differs.any():
+            changed |= differs
+            changed_columns.add(column)
+
+    reuse = np.full(len(new), -1, dtype=np.int64)
+    reuse[new_common[~changed]] = old_common[~changed]
+    delta = Delta(
+        added=new_keys[~common],
+        removed=old_keys[~old_positions.isin(new_keys)],
+        changed=new_keys[new_common[changed]],
+        unchanged=new_keys[new_common[~changed]]
+    )
+    aligned = len(old) == len(new) and bool(np.array_equal(in_old, np.arange(len(new))))
+    return RowPatch(delta, reuse, changed_columns, aligned)
+
+def diff_frames(old, new, columns=None, key=KEY_COLUMN):
+    """Différences entre deux versions du DataFrame des formations (Delta)"""
+    return match_rows(old, new, columns, key).delta
+
+def splice_metrics(previous_metrics, frame, reuse):
+    """Indicateurs dérivés de la nouvelle version : lignes reprises recopiées, les autres recalculées"""
+    reused_new = np.flatnonzero(reuse >= 0)
+    fresh_new = np.flatnonzero(reuse < 0)
+    fresh = compute_metrics(frame.iloc[fresh_new])
+
+    columns = {}
+    for name, old_values in previous_metrics.items():
+        old_array = old_values.to_numpy()
+        fresh_array = fresh[name].to_numpy()
+        values = np.empty(len(frame), dtype=np.result_type(old_array, fresh_array))
+        values[reused_new] = old_array[reuse[reused_new]]
+        values[fresh_new] = fresh_array
+        columns[name] = values
+    return pd.DataFrame(columns, index=frame.index)
+
+def splice_dataset(previous, frame, reuse):
+    """(indicateurs, index, cube ou None) de la nouvelle version raccordés à la précédente
+
+    Retourne None quand la correspondance ne peut pas servir (taille incohérente) :
+    il faut alors tout recalculer.
+    """
+    reuse = np.asarray(reuse, dtype=np.int64)
+    if len(reuse) != len(frame) or (len(reuse) and reuse.max() >= len(previous.frame)):
+        return None
+    metrics = splice_metrics(previous.metrics, frame, reuse)
+    index = previous.index.spliced(frame, reuse)
+    # Le cube n'est raccordé que s'il avait été construit pour la version précédente
+    cube = previous.cached_value('cube')
+    cube = cube.spliced(metrics, reuse) if cube is not None else None
+    return metrics, index, cube
+
+def frame_reuse(previous, frame):
+    """Correspondance calculée en comparant les deux versions (None si la clé manque ou n'est pas unique)"""
+    if KEY_COLUMN not in previous.frame.columns or KEY_COLUMN not in frame.columns:
+        return None
+    try:
+        return match_rows(previous.frame, frame).reuse
+    except ValueError:
+        return None
+
+def patch_snapshot(snapshot_dir, frame, patch, source_digest, replaces=None):
+    """Nouveau snapshot : colonnes inchangées reprises de la version courante, autres réécrites"""
+    manifest = read_manifest(snapshot_dir)
+    version_dir = Path(snapshot_dir) / manifest['directory']
+    reused = {}
+    if patch.aligned:
+        for spec in manifest['columns']:
+            if spec['name'] in frame.columns and spec['name'] not in patch.changed_columns:
+                reused[spec['name']] = (version_dir / spec['file'], spec)
+    return write_snapshot(frame, snapshot_dir, source_digest=source_digest, reused=reused,
+                          patch={'base': manifest['directory'], 'reuse': patch.reuse}, replaces=replaces)
+
+def publish_export(new_source, target):
+    """Remplace atomiquement l'export courant par le nouveau (copie puis os.replace)"""
+    target = Path(target)
+    tmp_target = target.with_name(f".{target.name}.tmp")
+    shutil.copyfile(new_source, tmp_target)
+    os.replace(tmp_target, target)
+
+def main(argv=None):
+    """Compare un nouvel export à la version courante et le publie s'il diffère"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Usage: python -m components.parcoursup.delta nouvel_export.json [export_courant.json]")
+        return 2
+    new_source = Path(argv[0])
+    target = Path(argv[1]) if len(argv) > 1 else DEFAULT_SOURCE
+    snapshot_dir = target.with_suffix('.snapshot')
+    has_snapshot = (snapshot_dir / MANIFEST_NAME).exists()
+    fresh_snapshot = target.exists() and has_snapshot and snapshot_is_fresh(target, snapshot_dir)
+
+    new = apply_schema(read_json_frame(new_source))
+    patch = None
+    if fresh_snapshot:
+        # Version courante lue depuis le snapshot mappé : l'ancien JSON n'est pas reparsé
+        patch = match_rows(load_snapshot(snapshot_dir), new)
+    elif target.exists():
+        patch = match_rows(apply_schema(read_json_frame(target)), new)
+    if patch is not None:
+        print(f"Différences: {patch.delta.summary()}")
+        if not patch:
+            print("Aucune modification, export courant conservé")
+            return 0
+
+    # Snapshot écrit avant le JSON : son manifest indique le JSON qu'il remplace, pour
+    # que le mode auto le serve dès maintenant au lieu de reparser l'ancien JSON
+    source_digest = file_digest(new_source)
+    replaces = file_digest(target) if target.exists() else None
+    if fresh_snapshot:
+        patch_snapshot(snapshot_dir, new, patch, source_digest, replaces=replaces)
+        print(f"Snapshot mis à jour: {snapshot_dir} ({len(patch.changed_columns)} colonne(s) réécrite(s))"
+              if patch.aligned else f"Snapshot mis à jour: {snapshot_dir}")
+    elif has_snapshot:
+        write_snapshot(new, snapshot_dir, source_digest=source_digest, replaces=replaces)
+        print(f"Snapshot reconstruit: {snapshot_dir}")
+
+    # Les sessions en cours basculent sur la nouvelle version au prochain accès au store,
+    # qui ne recalcule que les lignes modifiées
+    publish_export(new_source, target)
+    print(f"Export publié: {target}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Multiplicateurs mention et boursier ajustés par formation.
+
+Les bonus historiques (×1,3 / ×1,6 / ×2,0 et 1 + max(10 %, taux de boursiers))
+sont les mêmes pour toutes les formations. Ici, chaque formation reçoit ses
+propres multiplicateurs, estimés une fois par version à partir :
+
+- des admis par mention (`acc_sansmention`, `acc_ab`, `acc_b`, `acc_tb`,
+  `acc_tbf`) : la part d'une mention chez les admis de la formation, comparée
+  à sa part sur l'ensemble des formations, module le bonus de cette mention
+  (l'export ne donne pas la répartition des candidats par mention, le niveau
+  national reste donc celui des bonus historiques) ;
+- des propositions aux boursiers (`prop_tot_*_brs` / `nb_voe_pp_*_brs`),
+  rapportées au taux de proposition de tous les candidats.
+
+Les petits effectifs sont ramenés vers l'ensemble des formations pour que
+quelques admis ne donnent pas de multiplicateur extrême. Pour les mentions, le
+rétrécissement porte sur le logarithme du multiplicateur, avec un poids
+`n·p / (n·p + MENTION_PRIOR_COUNT)` (n admis, p part commune de la mention) :
+une mention rare demande davantage d'admis pour s'écarter du bonus historique.
+Les multiplicateurs restent ordonnés (sans mention ≤ AB ≤ B ≤ TB) et jamais
+inférieurs à 1 : une mention ne pénalise pas.
+"""
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.scoring import (MENTION_BONUS, MENTIONS, ScoreResult, base_rate_matrix,
+                                          boursier_bonus_row, encode_profiles)
+
+# Colonnes d'admis par mention (la mention TB avec félicitations compte comme TB)
+MENTION_COLUMNS = {
+    'Sans mention': ('acc_sansmention',),
+    'AB': ('acc_ab',),
+    'B': ('acc_b',),
+    'TB': ('acc_tb', 'acc_tbf')
+}
+BOURSIER_GROUPS = ('bg', 'bt', 'bp')
+ALL_GROUPS = ('bg', 'bt', 'bp', 'at')
+
+# Pseudo-effectif de l'ensemble des formations ajouté à chaque formation (taux boursiers)
+PRIOR_STRENGTH = 30.0
+# Admis attendus d'une mention pour que la formation pèse autant que l'ensemble
+MENTION_PRIOR_COUNT = 20.0
+# Plancher des multiplicateurs de mention
+MIN_MENTION_MULTIPLIER = 1.0
+# Bornes des multiplicateurs ajustés
+MIN_MULTIPLIER = 0.5
+MAX_MULTIPLIER = 4.0
+
+# Colonne de la table ajustée pour chaque mention
+MENTION_KEYS = {
+    'Sans mention': 'bonus_sansmention',
+    'AB': 'bonus_ab',
+    'B': 'bonus_b',
+    'TB': 'bonus_tb'
+}
+
+def _column(frame, name):
+    if name not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _shrunk_rate(successes, trials, pooled_rate):
+    """Taux par formation ramené vers le taux commun : (succès + K·p) / (essais + K)"""
+    successes = np.nan_to_num(successes)
+    trials = np.nan_to_num(trials)
+    return (successes + PRIOR_STRENGTH * pooled_rate) / (trials + PRIOR_STRENGTH)
+
+def fit_mention_multipliers(frame):
+    """Multiplicateur de chaque mention par formation (dict mention -> tableau), croissant avec la mention"""
+    counts = {
+        mention: sum(np.nan_to_num(_column(frame, name)) for name in columns)
+        for mention, columns in MENTION_COLUMNS.items()
+    }
+    admitted = sum(counts.values())
+    total = admitted.sum()
+    if total <= 0:
+        # Aucune donnée exploitable : bonus historiques
+        return {mention: np.full(len(frame), MENTION_BONUS[mention]) for mention in MENTIONS}
+
+    pooled = {mention: counts[mention].sum() / total for mention in MENTIONS}
+    # Écart (log) de la part de chaque mention à sa part commune, rétréci selon les admis attendus
+    deviations = {}
+    for mention in MENTIONS:
+        if pooled[mention] <= 0:
+            deviations[mention] = np.zeros(len(frame))
+            continue
+        # Un admis fictif réparti comme l'ensemble évite log(0) pour une mention absente
+        share = (counts[mention] + pooled[mention]) / (admitted + 1)
+        expected = admitted * pooled[mention]
+        weight = expected / (expected + MENTION_PRIOR_COUNT)
+        deviations[mention] = weight * np.log(share / pooled[mention])
+
+    multipliers = {}
+    floor = np.full(len(frame), MIN_MENTION_MULTIPLIER)
+    for mention in MENTIONS:
+        log_multiplier = np.log(MENTION_BONUS[mention]) + deviations[mention] - deviations['Sans mention']
+        # Maximum cumulé : chaque mention vaut au moins la précédente (et au moins 1)
+        floor = np.fmax(floor, np.minimum(np.exp(log_multiplier), MAX_MULTIPLIER))
+        multipliers[mention] = floor
+    return multipliers
+
+def fit_boursier_multiplier(frame):
+    """Multiplicateur boursier par formation : taux de proposition des boursiers / taux de tous"""
+    proposals_brs = sum(np.nan_to_num(_column(frame, f'prop_tot_{group}_brs')) for group in BOURSIER_GROUPS)
+    candidates_brs = sum(np.nan_to_num(_column(frame, f'nb_voe_pp_{group}_brs')) for group in BOURSIER_GROUPS)
+    proposals = sum(np.nan_to_num(_column(frame, f'prop_tot_{group}')) for group in ALL_GROUPS)
+    candidates = sum(np.nan_to_num(_column(frame, f'nb_voe_pp_{group}')) for group in ALL_GROUPS)
+    if candidates_brs.sum() <= 0 or proposals.sum() <= 0:
+        return None
+
+    rate_brs = _shrunk_rate(proposals_brs, candidates_brs, proposals_brs.sum() / candidates_brs.sum())
+    rate_all = _shrunk_rate(proposals, candidates, proposals.sum() / candidates.sum())
+    return np.clip(rate_brs / rate_all, MIN_MULTIPLIER, MAX_MULTIPLIER)
+
+def fit_multipliers(frame):
+    """Table des multiplicateurs ajustés (une ligne par formation, même index que le DataFrame)"""
+    fitted = {MENTION_KEYS[mention]: values for mention, values in fit_mention_multipliers(frame).items()}
+    boursier = fit_boursier_multiplier(frame)
+    # Sans colonnes boursiers (mode projeté...) : NaN, le bonus historique s'applique
+    fitted['bonus_boursier'] = np.full(len(frame), np.nan) if boursier is None else boursier
+    return pd.DataFrame(fitted, index=frame.index)
+
+def fitted_multipliers(dataset):
+    """Multiplicateurs de la version, ajustés une fois et partagés par toutes les sessions"""
+    return dataset.cached('fitted_multipliers', lambda dataset: fit_multipliers(dataset.frame))
+
+def score_profiles_fitted(profiles, multipliers, metrics):
+    """Probabilités (profils × formations, en %) : taux de base × multiplicateurs ajustés"""
+    groups, _, boursier = encode_profiles(profiles)
+    mentions = profiles['mention'].tolist() if hasattr(profiles, 'columns') else [p['mention'] for p in profiles]
+    table = np.vstack([multipliers[MENTION_KEYS[mention]].to_numpy() for mention in MENTIONS])
+    mention_bonus = table[[MENTIONS.index(mention) if mention in MENTIONS else 0 for mention in mentions]]
+
+    fitted_boursier = multipliers['bonus_boursier'].to_numpy()
+    boursier_row = np.where(np.isnan(fitted_boursier), boursier_bonus_row(metrics), fitted_boursier)
+    boursier_bonus = np.where(boursier[:, None], boursier_row[None, :], 1.0)
+
+    base_rates = base_rate_matrix(metrics)[groups]
+    probabilities = np.fmin(100, np.fmax(0, base_rates * mention_bonus * boursier_bonus))
+    return ScoreResult(probabilities, base_rates, mention_bonus, boursier_bonus)
@@ -0,0 +1,226 @@
+"""Gazetier local : résolution commune -> coordonnées, sans accès réseau.
+
+Le fichier `.data/gazetteer.csv` (colonnes nom, departement, lat, lon) n'est
+pas livré avec le dépôt ; il est construit une fois :
+
+    python -m components.parcoursup.gazetteer build [--communes communes.csv]
+
+à partir des villes des formations, complétées si besoin par un référentiel
+des communes (par exemple l'export « communes de France » de data.gouv.fr,
+colonnes nom_commune / latitude / longitude / code_departement). Sans ce
+fichier, seules les villes des formations (et des coordonnées « lat, lon »)
+sont reconnues.
+
+Les noms sont normalisés (accents, casse, tirets et apostrophes) et triés : la
+recherche exacte passe par un dictionnaire, la recherche par préfixe par une
+recherche dichotomique. Un préfixe doit compter au moins MIN_PREFIX_LENGTH
+caractères, et quand plusieurs communes correspondent (homonymes, préfixe
+partagé), c'est à l'utilisateur de choisir.
+"""
+import argparse
+import os
+import re
+import tempfile
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.geo import formation_coordinates
+from components.parcoursup.loading import open_store
+from components.parcoursup.store import DATA_DIR, file_signature
+
+DEFAULT_GAZETTEER = DATA_DIR / "gazetteer.csv"
+GAZETTEER_COLUMNS = ['nom', 'departement', 'lat', 'lon']
+
+# Noms de colonnes reconnus dans un référentiel de communes
+COMMUNE_NAME_COLUMNS = ('nom_commune', 'nom_commune_complet', 'nom', 'commune', 'libelle')
+LATITUDE_COLUMNS = ('latitude', 'lat')
+LONGITUDE_COLUMNS = ('longitude', 'lon', 'lng')
+DEPARTEMENT_COLUMNS = ('code_departement', 'departement', 'dep')
+
+# Longueur minimale d'un préfixe pour la recherche partielle
+MIN_PREFIX_LENGTH = 3
+# Communes proposées au choix quand la saisie est ambiguë
+MAX_CANDIDATES = 10
+
+COORDINATES_PATTERN = re.compile(r'^\s*(-?\d+(?:[.,]\d+)?)\s*[;, ]\s*(-?\d+(?:[.,]\d+)?)\s*$')
+
+def normalise_name(name):
+    """Forme de recherche d'un nom : sans accents, en minuscules, tirets et apostrophes en espaces"""
+    folded = unicodedata.normalize('NFKD', str(name))
+    folded = ''.join(character for character in folded if not unicodedata.combining(character))
+    folded = re.sub(r"[-'’_]", ' ', folded.casefold())
+    return ' '.join(folded.split())
+
+def parse_coordinates(text):
+    """(lat, lon) pour un texte « 45.76, 4.83 » (None si ce ne sont pas des coordonnées valides)"""
+    match = COORDINATES_PATTERN.match(text or '')
+    if not match:
+        return None
+    lat, lon = (float(value.replace(',', '.')) for value in match.groups())
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+def coordinates_place(text):
+    """Lieu saisi sous forme de coordonnées « lat, lon » (None sinon)"""
+    coordinates = parse_coordinates(text)
+    if coordinates is None:
+        return None
+    return {'nom': text.strip(), 'departement': '', 'lat': coordinates[0], 'lon': coordinates[1]}
+
+class Gazetteer:
+    """Communes indexées par nom normalisé"""
+
+    def __init__(self, frame):
+        frame = frame.dropna(subset=['lat', 'lon']).reset_index(drop=True)
+        keys = np.array([normalise_name(name) for name in frame['nom']], dtype=object)
+        order = np.argsort(keys, kind='stable')
+        self.names = frame['nom'].to_numpy(dtype=object)[order]
+        self.departements = frame['departement'].astype(str).to_numpy(dtype=object)[order]
+        self.lat = frame['lat'].to_numpy(dtype=np.float64)[order]
+        self.lon = frame['lon'].to_numpy(dtype=np.float64)[order]
+        self.keys = keys[order]
+        # Positions de chaque nom (plusieurs pour des homonymes)
+        self.by_key = {}
+        for position, key in enumerate(self.keys):
+            self.by_key.setdefault(key, []).append(position)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _entry(self, position):
+        return {
+            'nom': self.names[position],
+            'departement': self.departements[position],
+            'lat': float(self.lat[position]),
+            'lon': float(self.lon[position])
+        }
+
+    def search(self, prefix, limit=10):
+        """Communes dont le nom commence par `prefix` (ordre alphabétique)"""
+        key = normalise_name(prefix)
+        if not key:
+            return []
+        start = np.searchsorted(self.keys, key, side='left')
+        # Borne haute du préfixe : le plus grand caractère possible ajouté au préfixe
+        end = np.searchsorted(self.keys, key + '￿', side='left')
+        return [self._entry(position) for position in range(start, min(end, start + limit))]
+
+    def candidates(self, text, limit=MAX_CANDIDATES):
+        """Lieux possibles pour une saisie : coordonnées, homonymes du nom exact, ou communes du préfixe
+
+        Un préfixe plus court que MIN_PREFIX_LENGTH ne donne rien : « a » ne doit
+        pas désigner la première commune de l'alphabet.
+        """
+        place = coordinates_place(text)
+        if place is not None:
+            return [place]
+        key = normalise_name(text)
+        positions = self.by_key.get(key)
+        if positions is not None:
+            return [self._entry(position) for position in positions[:limit]]
+        if len(key) < MIN_PREFIX_LENGTH:
+            return []
+        return self.search(text, limit=limit)
+
+    def resolve(self, text):
+        """Lieu désigné sans ambiguïté par la saisie : dict (nom, departement, lat, lon) ou None"""
+        matches = self.candidates(text, limit=2)
+        return matches[0] if len(matches) == 1 else None
+
+def dataset_places(frame):
+    """Villes des formations avec leurs coordonnées moyennes (une ligne par ville et département)"""
+    if 'ville_etab' not in frame.columns:
+        return pd.DataFrame(columns=GAZETTEER_COLUMNS)
+    lat, lon = formation_coordinates(frame)
+    places = pd.DataFrame({
+        'nom': frame['ville_etab'].astype(str).to_numpy(),
+        'departement': frame['dep'].astype(str).to_numpy() if 'dep' in frame.columns else '',
+        'lat': lat,
+        'lon': lon
+    }).dropna(subset=['lat', 'lon'])
+    places = places.groupby(['nom', 'departement'], as_index=False, sort=True)[['lat', 'lon']].mean()
+    # Précision du mètre, largement suffisante pour des distances entre communes
+    return places.round({'lat': 6, 'lon': 6})
+
+def read_communes(path):
+    """Lit un référentiel de communes (CSV, séparateur détecté) au format du gazetier"""
+    communes = pd.read_csv(path, sep=None, engine='python', dtype=str)
+    lower = {column.lower(): column for column in communes.columns}
+
+    def pick(candidates, required=True):
+        for candidate in candidates:
+            if candidate in lower:
+                return communes[lower[candidate]]
+        if required:
+            raise ValueError(f"Colonne introuvable parmi {candidates} dans {path}")
+        return pd.Series('', index=communes.index)
+
+    return pd.DataFrame({
+        'nom': pick(COMMUNE_NAME_COLUMNS),
+        'departement': pick(DEPARTEMENT_COLUMNS, required=False).fillna(''),
+        'lat': pd.to_numeric(pick(LATITUDE_COLUMNS).str.replace(',', '.'), errors='coerce'),
+        'lon': pd.to_numeric(pick(LONGITUDE_COLUMNS).str.replace(',', '.'), errors='coerce')
+    }).dropna(subset=['nom', 'lat', 'lon'])
+
+def build_gazetteer(frame, communes=None):
+    """Table du gazetier : villes des formations, puis communes du référentiel (sans doublons)"""
+    tables = [dataset_places(frame)]
+    if communes is not None:
+        tables.append(read_communes(communes))
+    table = pd.concat(tables, ignore_index=True)
+    table['cle'] = [normalise_name(name) for name in table['nom']]
+    table = table.drop_duplicates(subset=['cle', 'departement'], keep='first')
+    return table.sort_values('cle', kind='stable')[GAZETTEER_COLUMNS].reset_index(drop=True)
+
+def write_gazetteer(table, target=DEFAULT_GAZETTEER):
+    """Écrit le gazetier de façon atomique"""
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=target.parent, prefix='.')
+    with os.fdopen(descriptor, 'w', encoding='utf-8', newline='') as file:
+        table.to_csv(file, index=False)
+    os.replace(temporary, target)
+    return target
+
+_loaded = (None, None)
+
+def load_gazetteer(path=DEFAULT_GAZETTEER):
+    """Gazetier du fichier local, relu seulement quand le fichier change"""
+    global _loaded
+    path = Path(path)
+    key = (path, file_signature(path))
+    if _loaded[0] != key:
+        table = pd.read_csv(path, dtype={'nom': str, 'departement': str}, keep_default_na=False)
+        _loaded = (key, Gazetteer(table))
+    return _loaded[1]
+
+def gazetteer_for(dataset, path=DEFAULT_GAZETTEER):
+    """Gazetier local s'il existe, sinon celui des villes de la version des données"""
+    try:
+        return load_gazetteer(path)
+    except FileNotFoundError:
+        return dataset.cached('gazetteer', lambda dataset: Gazetteer(dataset_places(dataset.frame)))
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Construit le gazetier local des communes")
+    parser.add_argument('command', choices=('build',))
+    parser.add_argument('--communes', type=Path, default=None,
+                        help="référentiel des communes (CSV, par exemple « communes de France » de data.gouv.fr) "
+                             "à ajouter aux villes des formations")
+    parser.add_argument('--output', type=Path, default=DEFAULT_GAZETTEER)
+    parser.add_argument('--mode', default="auto", help="mode de chargement des données (voir loading.open_store)")
+    args = parser.parse_args(argv)
+    if args.communes is not None and not args.communes.is_file():
+        parser.error(f"référentiel des communes introuvable: {args.communes}")
+
+    table = build_gazetteer(open_store(args.mode).get().frame, args.communes)
+    path = write_gazetteer(table, args.output)
+    print(f"{len(table):,} communes écrites dans {path}")
+
+if __name__ == "__main__":
+    main()
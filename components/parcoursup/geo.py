@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en km (tableaux numpy acceptés, NaN propagés)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    half_dlat = (lat2 - lat1) / 2
+    half_dlon = (lon2 - lon1) / 2
+    a = np.sin(half_dlat) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def formation_coordinates(frame):
+    """(lat, lon) des formations en float64, NaN si absentes"""
+    if 'lat' not in frame.columns or 'lon' not in frame.columns:
+        return np.full(len(frame), np.nan), np.full(len(frame), np.nan)
+    return frame['lat'].to_numpy(dtype=np.float64), frame['lon'].to_numpy(dtype=np.float64)
+
+def city_coordinates(frame):
+    """Coordonnées moyennes des formations de chaque ville (ville -> (lat, lon))"""
+    if 'ville_etab' not in frame.columns:
+        return {}
+    lat, lon = formation_coordinates(frame)
+    cities = frame['ville_etab'].astype(str).to_numpy()
+    known = ~(np.isnan(lat) | np.isnan(lon))
+    codes, names = pd.factorize(cities[known])
+    counts = np.bincount(codes, minlength=len(names))
+    mean_lat = np.bincount(codes, weights=lat[known], minlength=len(names)) / counts
+    mean_lon = np.bincount(codes, weights=lon[known], minlength=len(names)) / counts
+    return {name: (float(mean_lat[i]), float(mean_lon[i])) for i, name in enumerate(names)}
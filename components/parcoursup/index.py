@@ -0,0 +1,104 @@
+import numpy as np
+
+LABEL_COLUMN = 'g_ea_lib_vx'
+
+def _positions_by_key(values):
+    """Associe chaque valeur distincte au tableau des positions où elle apparaît"""
+    positions = {}
+    for position, value in enumerate(values):
+        if value is None or value != value:  # ignorer None et NaN
+            continue
+        positions.setdefault(value, []).append(position)
+    return {key: np.array(rows, dtype=np.int64) for key, rows in positions.items()}
+
+class FormationIndex:
+    """Index construits une fois par version du jeu de données.
+
+    - `by_uai` : code UAI -> positions des formations de l'établissement
+    - `by_aff_form` : cod_aff_form -> position de la formation
+    - `by_label` : libellé affiché -> position de la première formation portant ce libellé
+    - `options` : libellés triés pour alimenter les selectbox
+    """
+
+    def __init__(self, frame):
+        self.size = len(frame)
+        columns = frame.columns
+        self.by_uai = _positions_by_key(frame['cod_uai'].tolist()) if 'cod_uai' in columns else {}
+        self.by_aff_form = {}
+        if 'cod_aff_form' in columns:
+            for key, rows in _positions_by_key(frame['cod_aff_form'].tolist()).items():
+                self.by_aff_form[key] = int(rows[0])
+
+        self.by_label = {}
+        for position, label in enumerate(frame[LABEL_COLUMN].tolist()):
+            if isinstance(label, str):
+                self.by_label.setdefault(label, position)
+        self.options = tuple(sorted(self.by_label, key=str.casefold))
+
+    def spliced(self, frame, reuse):
+        """Index de la version suivante : positions des lignes reprises renumérotées, lignes nouvelles ajoutées
+
+        reuse : pour chaque ligne de `frame`, sa position dans la version indexée (-1 si ajoutée ou modifiée).
+        """
+        reuse = np.asarray(reuse, dtype=np.int64)
+        kept = np.flatnonzero(reuse >= 0)
+        fresh = np.flatnonzero(reuse < 0)
+        # Lignes reprises dans un autre ordre ou trop de lignes nouvelles : reconstruction complète
+        if np.any(np.diff(reuse[kept]) <= 0) or len(fresh) > len(frame) // 4:
+            return FormationIndex(frame)
+        remap = np.full(self.size, -1, dtype=np.int64)
+        remap[reuse[kept]] = kept
+
+        index = FormationIndex.__new__(FormationIndex)
+        index.size = len(frame)
+        columns = frame.columns
+
+        index.by_uai = {}
+        for key, rows in self.by_uai.items():
+            rows = remap[rows]
+            rows = rows[rows >= 0]
+            if len(rows):
+                index.by_uai[key] = rows
+        if 'cod_uai' in columns and len(fresh):
+            for key, rows in _positions_by_key(frame['cod_uai'].take(fresh).tolist()).items():
+                merged = np.concatenate((index.by_uai.get(key, np.empty(0, dtype=np.int64)), fresh[rows]))
+                index.by_uai[key] = np.sort(merged)
+
+        index.by_aff_form = {}
+        for key, row in self.by_aff_form.items():
+            if remap[row] >= 0:
+                index.by_aff_form[key] = int(remap[row])
+        if 'cod_aff_form' in columns and len(fresh):
+            for key, rows in _positions_by_key(frame['cod_aff_form'].take(fresh).tolist()).items():
+                row = int(fresh[rows[0]])
+                if key not in index.by_aff_form or row < index.by_aff_form[key]:
+                    index.by_aff_form[key] = row
+
+        # Libellés touchés (ligne nouvelle, ou première occurrence disparue) : première position recherchée
+        fresh_labels = frame[LABEL_COLUMN].take(fresh).tolist() if len(fresh) else []
+        touched = {label for label in fresh_labels if isinstance(label, str)}
+        index.by_label = {}
+        for label, row in self.by_label.items():
+            if remap[row] >= 0:
+                index.by_label[label] = int(remap[row])
+            else:
+                touched.add(label)
+        if touched:
+            labels = frame[LABEL_COLUMN].to_numpy(dtype=object)
+            for label in touched:
+                rows = np.flatnonzero(labels == label)
+                if len(rows):
+                    index.by_label[label] = int(rows[0])
+                else:
+                    index.by_label.pop(label, None)
+        index.options = (self.options if index.by_label.keys() == self.by_label.keys()
+                         else tuple(sorted(index.by_label, key=str.casefold)))
+        return index
+
+    def position(self, label):
+        """Position de la formation associée à un libellé (KeyError si inconnu)"""
+        return self.by_label[label]
+
+    def positions_for_uai(self, cod_uai):
+        """Positions des formations d'un établissement (tableau vide si inconnu)"""
+        return self.by_uai.get(cod_uai, np.empty(0, dtype=np.int64))
@@ -0,0 +1,178 @@
+"""Lecture en flux de l'export Parcoursup JSON avec projection de colonnes.
+
+Le tableau `results` est décodé formation par formation avec un tampon de
+taille bornée : seules les colonnes déclarées sont conservées, la mémoire
+utilisée ne dépend donc que du nombre de lignes et de colonnes gardées.
+"""
+import json
+
+import pandas as pd
+
+from components.parcoursup.store import DEFAULT_SOURCE
+
+# Colonnes utilisées par le modèle de prédiction et par les interfaces
+MODEL_COLUMNS = (
+    'session',
+    'cod_uai',
+    'cod_aff_form',
+    'g_ea_lib_vx',
+    'ville_etab',
+    'g_olocalisation_des_formations',
+    'dep',
+    'region_etab_aff',
+    'acad_mies',
+    'dep_lib',
+    'lib_comp_voe_ins',
+    'capa_fin',
+    'voe_tot',
+    'prop_tot',
+    'acc_tot',
+    'acc_tot_f',
+    'acc_neobac',
+    'acc_brs',
+    'taux_acces_ens',
+    'pct_bours',
+    'pct_f',
+    'pct_neobac',
+    'pct_aca_orig',
+    'pct_sansmention',
+    'pct_ab',
+    'pct_b',
+    'pct_tb',
+    'pct_bg',
+    'pct_bt',
+    'nb_voe_pp',
+    'nb_voe_pp_bg',
+    'nb_voe_pp_bt',
+    'nb_voe_pp_at',
+    'prop_tot_bg',
+    'prop_tot_bt',
+    'prop_tot_at',
+    'nb_cla_pp',
+    'nb_cla_pp_bg',
+    'nb_cla_pp_bt',
+    'nb_cla_pp_at',
+    'lib_grp1',
+    'ran_grp1',
+    'lib_grp2',
+    'ran_grp2',
+    'lib_grp3',
+    'ran_grp3',
+    'nb_voe_pp_bp',
+    'prop_tot_bp',
+    'nb_voe_pp_bg_brs',
+    'nb_voe_pp_bt_brs',
+    'nb_voe_pp_bp_brs',
+    'prop_tot_bg_brs',
+    'prop_tot_bt_brs',
+    'prop_tot_bp_brs',
+    'acc_sansmention',
+    'acc_ab',
+    'acc_b',
+    'acc_tb',
+    'acc_tbf',
+    'fili',
+    'lib_for_voe_ins',
+    'form_lib_voe_acc',
+    'select_form',
+    'contrat_etab'
+)
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+class _Reader:
+    """Tampon de lecture qui se recharge à la demande depuis le fichier"""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Ajoute un bloc au tampon en abandonnant la partie déjà consommée"""
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip(self, characters):
+        """Avance après les caractères donnés et retourne le suivant (ou None en fin de fichier)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in characters:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return None
+
+    def seek_results(self):
+        """Place le curseur juste après le crochet ouvrant du tableau `results`
+
+        Les clés de l'objet racine sont parcourues une à une et les valeurs des
+        autres clés sautées : le texte « results » dans une valeur ne compte pas.
+        """
+        if self.skip(_WHITESPACE) != '{':
+            raise ValueError("L'export n'est pas un objet JSON")
+        self.pos += 1
+        while True:
+            character = self.skip(_WHITESPACE + ',')
+            if character is None or character == '}':
+                raise ValueError("Clé 'results' introuvable dans l'export")
+            if character != '"':
+                raise ValueError("Export mal formé : clé attendue dans l'objet racine")
+            key = self.next_value()
+            if self.skip(_WHITESPACE) != ':':
+                raise ValueError(f"Export mal formé après la clé '{key}'")
+            self.pos += 1
+            if key == 'results':
+                break
+            self.skip(_WHITESPACE)
+            self.next_value()
+        if self.skip(_WHITESPACE) != '[':
+            raise ValueError("La clé 'results' ne contient pas un tableau")
+        self.pos += 1
+
+    def next_value(self):
+        """Décode la prochaine valeur JSON du tampon, en lisant plus si elle est incomplète"""
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # Un nombre en fin de tampon peut être tronqué : s'assurer qu'il est complet
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_results(path=DEFAULT_SOURCE, chunk_size=CHUNK_SIZE):
+    """Itère sur les formations du tableau `results` sans charger tout le fichier"""
+    with open(path, 'r', encoding='utf-8') as file:
+        reader = _Reader(file, chunk_size)
+        reader.seek_results()
+        while True:
+            character = reader.skip(_WHITESPACE + ',')
+            if character is None:
+                raise ValueError("Fin de fichier inattendue dans le tableau 'results'")
+            if character == ']':
+                return
+            yield reader.next_value()
+
+def read_projected_frame(path=DEFAULT_SOURCE, columns=MODEL_COLUMNS, chunk_size=CHUNK_SIZE):
+    """Construit un DataFrame réduit aux colonnes déclarées, en lisant l'export en flux"""
+    columns = tuple(columns)
+    values = {column: [] for column in columns}
+    for record in iter_results(path, chunk_size):
+        for column in columns:
+            values[column].append(record.get(column))
+    return pd.DataFrame(values, columns=list(columns))
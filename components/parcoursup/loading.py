@@ -0,0 +1,22 @@
+from components.parcoursup.ingest import read_projected_frame
+from components.parcoursup.snapshot import DEFAULT_SNAPSHOT, MANIFEST_NAME, load_snapshot, read_patch, snapshot_is_fresh
+from components.parcoursup.store import DEFAULT_SOURCE, get_store
+
+LOAD_MODES = ("auto", "json", "snapshot", "projected")
+
+def open_store(mode="auto"):
+    """Retourne le store partagé correspondant à un mode de chargement.
+
+    mode : "json" lit l'export JSON, "snapshot" mappe le snapshot colonnaire,
+    "projected" lit le JSON en flux en ne gardant que les colonnes du modèle,
+    "auto" utilise le snapshot s'il est à jour et le JSON sinon. Un snapshot
+    écrit par `delta` pour remplacer le JSON actuel est servi dès son écriture :
+    le JSON n'est jamais reparsé pendant la publication.
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Mode de chargement inconnu: {mode}")
+    if mode == "snapshot" or (mode == "auto" and snapshot_is_fresh(pending=True)):
+        return get_store(DEFAULT_SNAPSHOT / MANIFEST_NAME, loader=load_snapshot, patch_reader=read_patch)
+    if mode == "projected":
+        return get_store(DEFAULT_SOURCE, loader=read_projected_frame)
+    return get_store(DEFAULT_SOURCE)
@@ -0,0 +1,271 @@
+"""Modèle logistique d'admission, entraîné hors ligne.
+
+Entraînement (quelques secondes sur l'export national) :
+
+    python -m components.parcoursup.logistic train
+
+Chaque formation donne des observations groupées (propositions / candidats)
+par groupe de bac (général, technologique, autres) et, quand l'export les
+détaille, par statut boursier. Les variables explicatives décrivent la
+formation (`taux_acces_ens`, parts `pct_*`, effectifs `acc_*`, répartition des
+propositions `prop_tot_*`) et le profil (groupe de bac, boursier). La
+régression est ajustée par Newton-Raphson (IRLS) avec une légère pénalité L2.
+
+L'export ne donne pas les candidats par mention : la mention entre comme un
+décalage fixe des log-odds (log des bonus historiques), non estimé.
+
+Les coefficients sont écrits dans `.data/models/logistic/`, un fichier par
+version, et `LATEST` désigne la version servie. L'application ne fait que
+charger ce fichier : la prédiction est un produit matriciel
+(formations × variables) · (variables × profils).
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from components.parcoursup.loading import open_store
+from components.parcoursup.scoring import GROUP_ORDER, encode_profiles
+from components.parcoursup.store import DATA_DIR, file_signature
+
+MODEL_DIR = DATA_DIR / "models" / "logistic"
+LATEST_NAME = "LATEST"
+FORMAT_VERSION = 1
+
+# Variables de formation : colonne -> transformation
+SHARE_COLUMNS = (
+    'taux_acces_ens', 'pct_bours', 'pct_f', 'pct_neobac', 'pct_aca_orig',
+    'pct_sansmention', 'pct_ab', 'pct_b', 'pct_tb', 'pct_bg', 'pct_bt'
+)
+LOG_COUNT_COLUMNS = ('acc_tot', 'acc_neobac', 'acc_brs', 'capa_fin')
+PROPOSAL_GROUPS = ('bg', 'bt', 'at')
+# Variables de profil (indicatrices, le groupe 'bg' non boursier sert de référence)
+PROFILE_FEATURES = ('groupe_bt', 'groupe_at', 'boursier')
+
+# Pénalité L2 sur les coefficients standardisés (hors constante)
+RIDGE = 1e-3
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-8
+
+def _column(frame, name):
+    if name not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def feature_columns():
+    """Colonnes de l'export lues par formation_features"""
+    return (SHARE_COLUMNS + LOG_COUNT_COLUMNS + ('voe_tot', 'prop_tot')
+            + tuple(f'prop_tot_{group}' for group in PROPOSAL_GROUPS))
+
+def missing_columns(frame):
+    """Colonnes nécessaires au modèle absentes du DataFrame"""
+    return [name for name in feature_columns() if name not in frame.columns]
+
+def formation_features(frame):
+    """Variables explicatives des formations (formations × variables) et leurs noms"""
+    names, columns = [], []
+    for name in SHARE_COLUMNS:
+        names.append(name)
+        columns.append(_column(frame, name) / 100)
+    for name in LOG_COUNT_COLUMNS:
+        names.append(f'log_{name}')
+        columns.append(np.log1p(np.fmax(_column(frame, name), 0)))
+
+    voe_tot, capa = _column(frame, 'voe_tot'), _column(frame, 'capa_fin')
+    names.append('log_pression')
+    columns.append(np.log1p(np.divide(voe_tot, capa, out=np.full(len(frame), np.nan), where=capa > 0)))
+
+    prop_tot = _column(frame, 'prop_tot')
+    for group in PROPOSAL_GROUPS:
+        names.append(f'part_prop_{group}')
+        columns.append(np.divide(_column(frame, f'prop_tot_{group}'), prop_tot,
+                                 out=np.full(len(frame), np.nan), where=prop_tot > 0))
+    return np.column_stack(columns), names
+
+def training_rows(frame):
+    """Observations groupées : (indice de formation, groupe, boursier, propositions, candidats)"""
+    rows = []
+    positions = np.arange(len(frame))
+    for group_index, group in enumerate(GROUP_ORDER):
+        candidates = np.nan_to_num(_column(frame, f'nb_voe_pp_{group}'))
+        proposals = np.nan_to_num(_column(frame, f'prop_tot_{group}'))
+        candidates_brs = np.nan_to_num(_column(frame, f'nb_voe_pp_{group}_brs'))
+        proposals_brs = np.nan_to_num(_column(frame, f'prop_tot_{group}_brs'))
+        # Boursiers et non-boursiers séparés quand l'export les détaille (pas pour 'at')
+        for boursier, successes, trials in (
+            (1, proposals_brs, candidates_brs),
+            (0, proposals - proposals_brs, candidates - candidates_brs)
+        ):
+            keep = (trials > 0) & (successes >= 0)
+            count = int(keep.sum())
+            rows.append(np.column_stack((
+                positions[keep], np.full(count, group_index), np.full(count, boursier),
+                np.minimum(successes[keep], trials[keep]), trials[keep]
+            )))
+    return np.vstack(rows)
+
+def profile_design(groups, boursier):
+    """Indicatrices de profil (lignes × PROFILE_FEATURES)"""
+    return np.column_stack((
+        groups == GROUP_ORDER.index('bt'),
+        groups == GROUP_ORDER.index('at'),
+        boursier
+    )).astype(np.float64)
+
+def _standardise(features, means, scales):
+    """Centre-réduit les variables ; une valeur manquante prend la moyenne (0 une fois réduite)"""
+    standardised = (features - means) / scales
+    return np.where(np.isnan(standardised), 0.0, standardised)
+
+def fit_logistic(design, successes, trials, ridge=RIDGE):
+    """Régression logistique binomiale groupée par IRLS (première colonne : constante non pénalisée)"""
+    coefficients = np.zeros(design.shape[1])
+    penalty = np.full(design.shape[1], ridge * trials.sum())
+    penalty[0] = 0.0
+    for _ in range(MAX_ITERATIONS):
+        probabilities = 1 / (1 + np.exp(-(design @ coefficients)))
+        weights = trials * probabilities * (1 - probabilities)
+        gradient = design.T @ (successes - trials * probabilities) - penalty * coefficients
+        hessian = (design * weights[:, None]).T @ design + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        coefficients += step
+        if np.max(np.abs(step)) < TOLERANCE:
+            break
+    return coefficients
+
+def train(frame):
+    """Entraîne le modèle sur un DataFrame de formations et retourne l'artefact (dict sérialisable)"""
+    features, names = formation_features(frame)
+    means = np.nanmean(features, axis=0)
+    scales = np.nanstd(features, axis=0)
+    means = np.where(np.isnan(means), 0.0, means)
+    scales = np.where(np.isnan(scales) | (scales == 0), 1.0, scales)
+    standardised = _standardise(features, means, scales)
+
+    rows = training_rows(frame)
+    formations = rows[:, 0].astype(np.int64)
+    design = np.column_stack((
+        np.ones(len(rows)),
+        standardised[formations],
+        profile_design(rows[:, 1].astype(np.intp), rows[:, 2])
+    ))
+    coefficients = fit_logistic(design, rows[:, 3], rows[:, 4])
+    return {
+        'format': FORMAT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'observations': int(len(rows)),
+        'features': names,
+        'means': means.tolist(),
+        'scales': scales.tolist(),
+        'intercept': float(coefficients[0]),
+        'formation_coefficients': coefficients[1:1 + len(names)].tolist(),
+        'profile_features': list(PROFILE_FEATURES),
+        'profile_coefficients': coefficients[1 + len(names):].tolist()
+    }
+
+def save_model(model, model_dir=MODEL_DIR):
+    """Écrit une nouvelle version de l'artefact puis bascule LATEST dessus (écritures atomiques)"""
+    model_dir.mkdir(parents=True, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    path = model_dir / f"logistic-{version}.json"
+    for target, content in ((path, json.dumps(model, indent=2)), (model_dir / LATEST_NAME, path.name + '\n')):
+        descriptor, temporary = tempfile.mkstemp(dir=model_dir, prefix='.')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(temporary, target)
+    return path
+
+def latest_model_path(model_dir=MODEL_DIR):
+    """Chemin de la version servie (FileNotFoundError si aucun modèle n'a été entraîné)"""
+    name = (model_dir / LATEST_NAME).read_text(encoding='utf-8').strip()
+    return model_dir / name
+
+class LogisticModel:
+    """Artefact chargé : coefficients prêts pour le calcul vectorisé"""
+
+    def __init__(self, artefact, name=None):
+        if artefact.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Format de modèle non pris en charge: {artefact.get('format')}")
+        self.artefact = artefact
+        self.name = name
+        self.features = artefact['features']
+        self.means = np.asarray(artefact['means'])
+        self.scales = np.asarray(artefact['scales'])
+        self.intercept = artefact['intercept']
+        self.formation_coefficients = np.asarray(artefact['formation_coefficients'])
+        self.profile_coefficients = np.asarray(artefact['profile_coefficients'])
+
+    def formation_logits(self, frame):
+        """Partie formation des log-odds (une valeur par formation), calculée une fois par version"""
+        missing = missing_columns(frame)
+        if missing:
+            # Une variable absente serait remplacée par sa moyenne sans que rien ne le signale
+            raise ValueError(f"Colonnes du modèle logistique absentes des données: {', '.join(missing)}")
+        features, names = formation_features(frame)
+        if names != self.features:
+            raise ValueError("Les variables du modèle ne correspondent pas à celles des données")
+        return _standardise(features, self.means, self.scales) @ self.formation_coefficients + self.intercept
+
+    def predict(self, profiles, formation_logits):
+        """Probabilités (profils × formations, en %) : un produit matriciel et la fonction logistique"""
+        groups, mention_bonus, boursier = encode_profiles(profiles)
+        profile_logits = profile_design(groups, boursier) @ self.profile_coefficients + np.log(mention_bonus)
+        design = np.column_stack((formation_logits, np.ones(len(formation_logits))))
+        logits = (design @ np.vstack((np.ones(len(groups)), profile_logits))).T
+        return 100 / (1 + np.exp(-logits))
+
+_loaded = (None, None)
+
+def load_model(model_dir=MODEL_DIR):
+    """Charge la version servie, relue seulement quand LATEST ou le fichier changent"""
+    global _loaded
+    path = latest_model_path(model_dir)
+    key = (path, file_signature(path))
+    if _loaded[0] != key:
+        with open(path, encoding='utf-8') as file:
+            _loaded = (key, LogisticModel(json.load(file), name=path.name))
+    return _loaded[1]
+
+def model_available(model_dir=MODEL_DIR, frame=None):
+    """Indique si un modèle entraîné est disponible (et, si `frame` est donné, applicable à ces données)"""
+    if frame is not None and missing_columns(frame):
+        return False
+    try:
+        return latest_model_path(model_dir).exists()
+    except FileNotFoundError:
+        return False
+
+def formation_logits(dataset):
+    """Log-odds des formations pour le modèle servi, calculés une fois par version et par modèle"""
+    model = load_model()
+    cached = dataset.cached('logistic_logits', lambda dataset: {})
+    if model.name not in cached:
+        cached[model.name] = model.formation_logits(dataset.frame)
+    return model, cached[model.name]
+
+def score_profiles_logistic(profiles, dataset):
+    """Probabilités (profils × formations, en %) selon le modèle logistique servi"""
+    model, logits = formation_logits(dataset)
+    return model.predict(profiles, logits)
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande"""
+    parser = argparse.ArgumentParser(description="Entraîne le modèle logistique d'admission")
+    parser.add_argument('command', choices=('train',))
+    parser.add_argument('--mode', default="json", help="mode de chargement des données (voir loading.open_store)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    frame = open_store(args.mode).get().frame
+    model = train(frame)
+    path = save_model(model)
+    print(f"{model['observations']:,} observations, {len(frame):,} formations, "
+          f"entraîné en {time.perf_counter() - start:.2f} s")
+    print(f"Modèle écrit: {path}")
+
+if __name__ == "__main__":
+    main()
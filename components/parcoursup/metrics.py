@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+# Taux de base (propositions / candidats) par type de bac, DAEU et autres par défaut
+BAC_GROUPS = {
+    'bg': ('nb_voe_pp_bg', 'prop_tot_bg'),
+    'bt': ('nb_voe_pp_bt', 'prop_tot_bt'),
+    'at': ('nb_voe_pp_at', 'prop_tot_at')
+}
+BAC_TYPE_GROUPS = {
+    "Général": 'bg',
+    "Technologique": 'bt'
+}
+DEFAULT_GROUP = 'at'
+
+# Colonnes lues par compute_metrics : une formation dont aucune ne change garde ses indicateurs
+METRIC_INPUTS = (
+    'nb_voe_pp_bg', 'nb_voe_pp_bt', 'nb_voe_pp_at',
+    'prop_tot_bg', 'prop_tot_bt', 'prop_tot_at',
+    'voe_tot', 'capa_fin', 'prop_tot', 'acc_tot', 'pct_bours'
+)
+
+def bac_group(bac_type):
+    """Retourne le groupe de candidats ('bg', 'bt' ou 'at') d'un type de bac"""
+    return BAC_TYPE_GROUPS.get(bac_type, DEFAULT_GROUP)
+
+def safe_ratio(numerator, denominator):
+    """Division élément par élément qui vaut 0 quand le dénominateur est nul, négatif ou manquant"""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    valid = denominator > 0
+    result = np.zeros(np.broadcast(numerator, denominator).shape, dtype=np.float64)
+    np.divide(numerator, denominator, out=result, where=valid)
+    return result
+
+def compute_metrics(frame):
+    """Calcule en une passe vectorisée les indicateurs dérivés de chaque formation"""
+    column = lambda name: frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    metrics = {}
+    for group, (candidates, proposals) in BAC_GROUPS.items():
+        # Même ordre d'opérations que le calcul historique : propositions / candidats * 100
+        metrics[f'taux_base_{group}'] = safe_ratio(column(proposals), column(candidates)) * 100
+
+    metrics['taux_pression'] = safe_ratio(column('voe_tot'), column('capa_fin'))
+    metrics['taux_proposition'] = safe_ratio(column('prop_tot'), column('voe_tot')) * 100
+    # Soustraction faite par pandas pour garder le type entier compact
+    metrics['places_restantes'] = (frame['capa_fin'] - frame['acc_tot']).to_numpy()
+
+    total_prop = sum(column(proposals) for _, proposals in BAC_GROUPS.values())
+    metrics['total_prop_bac'] = total_prop
+    for group, (_, proposals) in BAC_GROUPS.items():
+        metrics[f'part_prop_{group}'] = safe_ratio(column(proposals), total_prop) * 100
+
+    metrics['taux_boursiers'] = column('pct_bours') / 100
+    return pd.DataFrame(metrics, index=frame.index)
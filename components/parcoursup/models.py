@@ -0,0 +1,37 @@
+"""Modèles de calcul disponibles, sélectionnables dans l'interface.
+
+Chaque modèle donne une matrice de probabilités (profils × formations, en %)
+à partir d'un Dataset ; les tables dont il a besoin sont construites une fois
+par version des données.
+"""
+from components.parcoursup.fitting import fitted_multipliers, score_profiles_fitted
+from components.parcoursup.logistic import model_available, score_profiles_logistic
+from components.parcoursup.rank_model import rank_thresholds, score_profiles_by_rank
+from components.parcoursup.scoring import score_profiles
+
+HEURISTIC_MODEL = "heuristique"
+
+MODEL_LABELS = {
+    HEURISTIC_MODEL: "Taux de proposition × bonus (heuristique)",
+    "rang": "Rang du dernier appelé",
+    "ajuste": "Bonus ajustés par formation",
+    "logistique": "Régression logistique (entraînée hors ligne)"
+}
+MODELS = tuple(MODEL_LABELS)
+
+def available_models(dataset=None):
+    """Modèles utilisables : le modèle logistique n'apparaît qu'une fois entraîné et si les données ont ses colonnes"""
+    frame = dataset.frame if dataset is not None else None
+    return tuple(model for model in MODELS if model != "logistique" or model_available(frame=frame))
+
+def model_probabilities(dataset, profiles, model=HEURISTIC_MODEL):
+    """Probabilités (profils × formations, en %) des profils selon le modèle choisi"""
+    if model == HEURISTIC_MODEL:
+        return score_profiles(profiles, dataset.metrics).probabilities
+    if model == "rang":
+        return score_profiles_by_rank(profiles, rank_thresholds(dataset), dataset.metrics).probabilities
+    if model == "ajuste":
+        return score_profiles_fitted(profiles, fitted_multipliers(dataset), dataset.metrics).probabilities
+    if model == "logistique":
+        return score_profiles_logistic(profiles, dataset)
+    raise ValueError(f"Modèle inconnu: {model}")
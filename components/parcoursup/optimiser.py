@@ -0,0 +1,107 @@
+"""Choix des k vœux qui maximisent les chances d'au moins une proposition.
+
+Les probabilités de toutes les formations pour le profil sont lues dans le
+cube ; les contraintes (région, distance, capacité...) réduisent l'ensemble
+des candidats par masques. La recherche est gloutonne et incrémentale : à
+chaque étape, le gain marginal de toutes les formations restantes est calculé
+en une opération vectorisée, puis la meilleure est ajoutée.
+
+- objectif "p_any" : P(au moins une proposition) = 1 - Π(1 - p). Le glouton
+  est exact ici, y compris avec les quotas de sélectivité (argument d'échange).
+- objectif "preference" : espérance de l'utilité de la meilleure proposition
+  reçue, les vœux étant classés par utilité décroissante.
+"""
+import numpy as np
+
+from components.parcoursup.geo import formation_coordinates, haversine_km
+from components.parcoursup.models import HEURISTIC_MODEL
+from components.parcoursup.recommend import filter_index
+from components.parcoursup.simulation import MAX_VOEUX, profile_probabilities
+
+OBJECTIVES = ("p_any", "preference")
+# Une formation est dite sélective quand moins de 30 % des candidats reçoivent une proposition
+SELECTIVE_BELOW = 30.0
+
+class VoeuxPlan:
+    """Liste de vœux proposée : positions (ordre de préférence), probabilités et valeurs de l'objectif"""
+
+    def __init__(self, positions, probabilities, utilities):
+        self.positions = positions
+        self.probabilities = probabilities
+        self.p_any = float(1 - np.prod(1 - probabilities))
+        self.expected_offers = float(probabilities.sum())
+        self.expected_utility = float(expected_best_utility(probabilities, utilities))
+
+def expected_best_utility(probabilities, utilities):
+    """Espérance de l'utilité de la meilleure proposition (vœux triés par utilité décroissante)"""
+    misses_before = np.concatenate(([1.0], np.cumprod(1 - probabilities)[:-1]))
+    return np.sum(utilities * probabilities * misses_before)
+
+def candidate_mask(dataset, origin=None, max_km=None, **filters):
+    """Formations autorisées par les filtres d'index et la distance maximale à `origin` (lat, lon)"""
+    mask = filter_index(dataset).mask(**filters)
+    if mask is None:
+        mask = np.ones(len(dataset.frame), dtype=bool)
+    if origin is not None and max_km is not None:
+        lat, lon = formation_coordinates(dataset.frame)
+        # NaN (formation non géolocalisée) : comparaison fausse, formation exclue
+        mask &= haversine_km(origin[0], origin[1], lat, lon) <= max_km
+    return mask
+
+def _marginal_gains(objective, probabilities, utilities, chosen):
+    """Gain de l'objectif pour l'ajout de chaque candidat à la liste courante"""
+    if objective == "p_any":
+        return probabilities * np.prod(1 - probabilities[chosen])
+
+    # Liste courante triée par utilité décroissante ; un candidat s'insère à son rang
+    order = np.asarray(chosen, dtype=np.int64)[np.argsort(-utilities[chosen], kind='stable')]
+    chosen_p, chosen_u = probabilities[order], utilities[order]
+    misses = np.concatenate(([1.0], np.cumprod(1 - chosen_p)))
+    terms = chosen_u * chosen_p * misses[:-1]
+    # Somme des termes situés après chaque rang d'insertion
+    tail = np.concatenate((np.cumsum(terms[::-1])[::-1], [0.0]))
+    ranks = np.searchsorted(-chosen_u, -utilities, side='right')
+    return probabilities * (utilities * misses[ranks] - tail[ranks])
+
+def optimise_voeux(dataset, profile, k=MAX_VOEUX, objective="p_any", utilities=None,
+                   origin=None, max_km=None, min_selective=0, min_open=0, model=HEURISTIC_MODEL, **filters):
+    """Choisit k vœux pour un profil.
+
+    utilities : préférence du candidat pour chaque formation (toutes positions ;
+        objectif "preference", 1 partout par défaut).
+    origin, max_km : point (lat, lon) et distance maximale en km.
+    min_selective, min_open : nombre minimal de formations sélectives / moins sélectives.
+    model : modèle de calcul des probabilités (voir parcoursup.models).
+    filters : region, academie, departement, min_capacity, max_pressure (voir FilterIndex.mask).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Objectif inconnu: {objective}")
+    if min_selective + min_open > k:
+        raise ValueError("Les quotas de sélectivité dépassent le nombre de vœux")
+
+    size = len(dataset.frame)
+    probabilities = profile_probabilities(dataset, profile, np.arange(size), model)
+    utilities = np.ones(size) if utilities is None else np.asarray(utilities, dtype=np.float64)
+    available = candidate_mask(dataset, origin, max_km, **filters)
+    selective = np.asarray(dataset.metrics['taux_proposition'], dtype=np.float64) < SELECTIVE_BELOW
+
+    chosen = []
+    needed = {True: min_selective, False: min_open}
+    while len(chosen) < k and available.any():
+        remaining = k - len(chosen)
+        allowed = available
+        if needed[True] + needed[False] >= remaining:
+            # Plus de place libre : seules les catégories encore exigées restent possibles
+            allowed = available & np.where(selective, needed[True] > 0, needed[False] > 0)
+            if not allowed.any():
+                break
+        gains = np.where(allowed, _marginal_gains(objective, probabilities, utilities, chosen), -np.inf)
+        best = int(np.argmax(gains))
+        chosen.append(best)
+        available[best] = False
+        needed[bool(selective[best])] = max(0, needed[bool(selective[best])] - 1)
+
+    positions = np.asarray(chosen, dtype=np.int64)
+    # Ordre de préférence : utilité décroissante, puis chances décroissantes
+    positions = positions[np.lexsort((-probabilities[positions], -utilities[positions]))]
+    return VoeuxPlan(positions, probabilities[positions], utilities[positions])
@@ -0,0 +1,150 @@
+"""Jeu de données partitionné par session Parcoursup.
+
+Chaque session (année) est une partition indépendante dans `.data/` :
+`parcoursup_<session>.json` ou son snapshot `parcoursup_<session>.snapshot/`.
+Le fichier historique `parcoursup.json` compte comme la partition de la
+session indiquée dans ses données ; il est servi par le store partagé de
+l'application (`loading.open_store`), pour n'être gardé qu'une fois en mémoire.
+Les partitions ne sont lues qu'à la demande et seules les plus récemment
+utilisées restent en mémoire ; `get_many` lit les sessions absentes du cache
+sans les y faire entrer.
+"""
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from components.parcoursup.ingest import iter_results
+from components.parcoursup.loading import open_store
+from components.parcoursup.snapshot import MANIFEST_NAME, load_snapshot, read_patch, snapshot_is_fresh
+from components.parcoursup.store import DATA_DIR, DEFAULT_SOURCE, DatasetStore, file_signature
+
+PARTITION_PATTERN = re.compile(r"^parcoursup_(\d{4})\.json$")
+DEFAULT_MAX_PARTITIONS = 3
+
+def read_session(path):
+    """Lit la session du premier enregistrement d'un export, sans charger le reste"""
+    for record in iter_results(path):
+        session = record.get('session')
+        return str(session) if session is not None else None
+    return None
+
+class PartitionedStore:
+    """Store d'une partition par session, chargées paresseusement dans un cache borné"""
+
+    def __init__(self, data_dir=DATA_DIR, max_partitions=DEFAULT_MAX_PARTITIONS):
+        self.data_dir = Path(data_dir)
+        self.max_partitions = max_partitions
+        self._lock = threading.Lock()
+        self._stores = OrderedDict()
+        self._catalogue = (None, {})
+        self._legacy_sessions = {}
+
+    def _discover(self):
+        """Associe chaque session disponible à son fichier JSON source"""
+        sources = {}
+        for path in self.data_dir.glob("parcoursup_*.json"):
+            match = PARTITION_PATTERN.match(path.name)
+            if match:
+                sources[match.group(1)] = path
+
+        # Fichier historique sans année dans le nom : la session est lue dans les données
+        legacy = self.data_dir / DEFAULT_SOURCE.name
+        if legacy.exists():
+            signature = file_signature(legacy)
+            cached = self._legacy_sessions.get(signature)
+            if cached is None:
+                cached = read_session(legacy)
+                self._legacy_sessions = {signature: cached}
+            if cached is not None:
+                sources.setdefault(cached, legacy)
+        return sources
+
+    def _sources(self):
+        """Catalogue des partitions, recalculé seulement quand le dossier change"""
+        signature = file_signature(self.data_dir)
+        cached_signature, sources = self._catalogue
+        if cached_signature != signature:
+            sources = self._discover()
+            self._catalogue = (signature, sources)
+        return sources
+
+    def sessions(self):
+        """Liste triée des sessions disponibles"""
+        with self._lock:
+            return sorted(self._sources())
+
+    def _make_store(self, source):
+        """Crée le store d'une partition, sur son snapshot s'il est à jour"""
+        if source.resolve() == DEFAULT_SOURCE.resolve():
+            # Export historique : même store que le reste de l'application
+            return open_store()
+        snapshot_dir = source.with_suffix('.snapshot')
+        if snapshot_is_fresh(source, snapshot_dir, pending=True):
+            return DatasetStore(snapshot_dir / MANIFEST_NAME, loader=load_snapshot, patch_reader=read_patch)
+        return DatasetStore(source)
+
+    def get(self, session):
+        """Retourne le Dataset d'une session, en le chargeant au premier accès"""
+        session = str(session)
+        with self._lock:
+            sources = self._sources()
+            if session not in sources:
+                raise KeyError(f"Session Parcoursup inconnue: {session}")
+            store = self._stores.get(session)
+            if store is None:
+                store = self._make_store(sources[session])
+                self._stores[session] = store
+            self._stores.move_to_end(session)
+            # Les partitions les moins récemment utilisées sont libérées
+            while len(self._stores) > self.max_partitions:
+                self._stores.popitem(last=False)
+        return store.get()
+
+    def get_many(self, sessions):
+        """Retourne les Datasets des sessions demandées, dans l'ordre demandé
+
+        Les partitions absentes du cache sont lues à part, sans y entrer : parcourir
+        toutes les sessions (tables d'évolution) n'évince pas les partitions en
+        cours d'usage et ne garde pas toutes les années en mémoire.
+        """
+        datasets = []
+        for session in sessions:
+            session = str(session)
+            with self._lock:
+                sources = self._sources()
+                if session not in sources:
+                    raise KeyError(f"Session Parcoursup inconnue: {session}")
+                store = self._stores.get(session) or self._make_store(sources[session])
+            datasets.append(store.get())
+        return datasets
+
+    def signatures(self, sessions):
+        """Signatures (mtime, taille) des fichiers sources des sessions, sans charger les partitions"""
+        with self._lock:
+            sources = self._sources()
+            missing = [str(session) for session in sessions if str(session) not in sources]
+            if missing:
+                raise KeyError(f"Session Parcoursup inconnue: {', '.join(missing)}")
+            return tuple((str(session), file_signature(sources[str(session)])) for session in sessions)
+
+    def loaded_stores(self):
+        """Stores des partitions actuellement gardées en mémoire"""
+        with self._lock:
+            return list(self._stores.values())
+
+    def loaded_sessions(self):
+        """Sessions actuellement gardées en mémoire, de la plus ancienne utilisée à la plus récente"""
+        with self._lock:
+            return list(self._stores)
+
+_partitioned_store = None
+_partitioned_lock = threading.Lock()
+
+def get_partitioned_store():
+    """Retourne le store partitionné partagé par tout le processus"""
+    global _partitioned_store
+    with _partitioned_lock:
+        if _partitioned_store is None:
+            _partitioned_store = PartitionedStore()
+        return _partitioned_store
@@ -0,0 +1,121 @@
+"""Modèle par rang : probabilité d'être appelé d'après le rang du dernier appelé.
+
+Pour chaque formation, l'export donne jusqu'à trois groupes de classement
+(`lib_grp1..3`) avec le rang du dernier candidat appelé (`ran_grp1..3`), et le
+nombre de candidats par type de bac (`nb_voe_pp_*`). La part appelée d'un
+groupe est `rang du dernier appelé / candidats du groupe` : les candidats non
+classés comptent au dénominateur, puisqu'ils ne seront jamais appelés. Un
+rang supérieur au nombre de candidats signale un groupe mal rapproché des
+types de bac : la formation retombe alors sur le taux de proposition.
+
+Le rang du candidat dans son groupe est estimé par une bande de percentiles
+selon la mention (uniforme sur la bande) ; la probabilité d'être appelé est la
+part de la bande située sous la part appelée. Les parts appelées sont
+calculées une fois par version (tableau groupes × formations).
+"""
+import numpy as np
+
+from components.parcoursup.scoring import GROUP_ORDER, MIN_BOURSIER_BONUS, ScoreResult, encode_profiles
+
+RANK_GROUPS = (1, 2, 3)
+
+# Percentiles (0 : premier classé, 1 : dernier) du rang estimé selon la mention
+MENTION_PERCENTILES = {
+    'Sans mention': (0.4, 1.0),
+    'AB': (0.2, 0.8),
+    'B': (0.05, 0.5),
+    'TB': (0.0, 0.2)
+}
+DEFAULT_PERCENTILES = MENTION_PERCENTILES['Sans mention']
+
+# Candidats (phase principale) de chaque groupe de bac
+APPLICANT_COLUMNS = {
+    'bg': 'nb_voe_pp_bg',
+    'bt': 'nb_voe_pp_bt',
+    'at': 'nb_voe_pp_at'
+}
+
+def group_of_label(label):
+    """Groupe de bac visé par un libellé lib_grp* ('bg', 'bt', 'at', ou None pour « tous / autres »)"""
+    if not isinstance(label, str):
+        return None
+    label = label.casefold()
+    if 'technolog' in label:
+        return 'bt'
+    if 'généra' in label or 'genera' in label:
+        return 'bg'
+    if 'professionn' in label:
+        return 'bp'
+    return None
+
+def called_fractions(frame, metrics):
+    """Part appelée (0-1) de chaque groupe de bac par formation, tableau (groupes × formations).
+
+    Une formation sans groupe de classement exploitable (absent, ou rang
+    au-delà du nombre de candidats) retombe sur le taux de proposition du
+    groupe (propositions / candidats).
+    """
+    size = len(frame)
+    column = lambda name: (frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+                           if name in frame.columns else np.full(size, np.nan))
+
+    applicants = {group: column(name) for group, name in APPLICANT_COLUMNS.items()}
+    total_applicants = column('nb_voe_pp')
+
+    # Groupe explicite (technologiques, généraux...) : son rang et ses candidats
+    explicit_rank = {group: np.full(size, np.nan) for group in GROUP_ORDER}
+    explicit_size = {group: np.full(size, np.nan) for group in GROUP_ORDER}
+    # Groupe « autres candidats » : tous les candidats moins ceux des groupes explicites
+    other_rank = np.full(size, np.nan)
+    listed = np.zeros(size)
+    for number in RANK_GROUPS:
+        label_column, rank_column = f'lib_grp{number}', f'ran_grp{number}'
+        if label_column not in frame.columns or rank_column not in frame.columns:
+            continue
+        groups = np.array([group_of_label(label) for label in frame[label_column].tolist()], dtype=object)
+        has_label = frame[label_column].notna().to_numpy()
+        ranks = column(rank_column)
+        for group in GROUP_ORDER:
+            match = (groups == group) & np.isnan(explicit_rank[group])
+            explicit_rank[group][match] = ranks[match]
+            explicit_size[group][match] = applicants[group][match]
+            listed[match] += np.nan_to_num(applicants[group][match])
+        catch_all = has_label & (groups == None) & np.isnan(other_rank)  # noqa: E711
+        other_rank[catch_all] = ranks[catch_all]
+    other_size = total_applicants - listed
+
+    rows = []
+    for group in GROUP_ORDER:
+        rank = np.where(np.isnan(explicit_rank[group]), other_rank, explicit_rank[group])
+        group_size = np.where(np.isnan(explicit_rank[group]), other_size, explicit_size[group])
+        fraction = np.full(size, np.nan)
+        np.divide(rank, group_size, out=fraction, where=group_size > 0)
+        # Rang au-delà des candidats du groupe : rapprochement incohérent, pas une part appelée
+        fraction[(fraction < 0) | (fraction > 1)] = np.nan
+        fallback = np.asarray(metrics[f'taux_base_{group}'], dtype=np.float64) / 100
+        rows.append(np.where(np.isnan(fraction), fallback, fraction))
+    return np.vstack(rows)
+
+def rank_thresholds(dataset):
+    """Parts appelées de la version, calculées une fois et partagées par toutes les sessions"""
+    return dataset.cached('rank_thresholds', lambda dataset: called_fractions(dataset.frame, dataset.metrics))
+
+def score_profiles_by_rank(profiles, fractions, metrics):
+    """Probabilités (profils × formations, en %) d'être appelé selon le rang estimé.
+
+    Les boursiers voient leur percentile réduit du taux de boursiers de la
+    formation (10 % minimum), comme le bonus du modèle heuristique.
+    """
+    groups, _, boursier = encode_profiles(profiles)
+    mentions = profiles['mention'].tolist() if hasattr(profiles, 'columns') else [p['mention'] for p in profiles]
+    bands = np.array([MENTION_PERCENTILES.get(mention, DEFAULT_PERCENTILES) for mention in mentions])
+    low, high = bands[:, :1], bands[:, 1:]
+
+    rates = np.atleast_1d(np.asarray(metrics['taux_boursiers'], dtype=np.float64))
+    # Percentile jamais réduit à moins de 10 % de sa valeur (formation presque entièrement boursière)
+    scale = np.where(boursier[:, None], np.maximum(1 - np.fmax(MIN_BOURSIER_BONUS, rates), 0.1)[None, :], 1.0)
+    called = fractions[groups]
+
+    # P(percentile × scale <= part appelée), percentile uniforme sur [low, high]
+    probabilities = np.clip((called / scale - low) / (high - low), 0, 1) * 100
+    return ScoreResult(probabilities, called * 100, np.ones(len(groups)), 1 / scale)
@@ -0,0 +1,157 @@
+"""Recommandation des k meilleures formations pour un profil, sous filtres.
+
+Les filtres s'appuient sur des index construits une fois par version du jeu
+de données (listes de positions par région, académie, département ; valeurs
+triées pour les seuils de capacité et de taux de pression). Seules les k
+formations retenues sont triées : pas de tri complet à chaque interaction.
+"""
+import numpy as np
+
+from components.parcoursup.cube import profile_in_cube
+from components.parcoursup.geo import formation_coordinates, haversine_km
+from components.parcoursup.index import _positions_by_key
+from components.parcoursup.models import HEURISTIC_MODEL, model_probabilities
+
+# Filtre -> colonne indexée
+CATEGORY_FILTERS = {
+    'region': 'region_etab_aff',
+    'academie': 'acad_mies',
+    'departement': 'dep_lib'
+}
+DEFAULT_TOP_K = 20
+# Distance à laquelle l'attrait géographique d'une formation est divisé par e
+DISTANCE_SCALE_KM = 150.0
+
+class _SortedColumn:
+    """Valeurs d'une colonne triées une fois, pour les filtres à seuil (NaN exclus)"""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        known = np.flatnonzero(~np.isnan(values))
+        order = known[np.argsort(values[known], kind='stable')]
+        self.positions = order
+        self.values = values[order]
+
+    def at_least(self, threshold):
+        """Positions dont la valeur est >= seuil"""
+        return self.positions[np.searchsorted(self.values, threshold, side='left'):]
+
+    def at_most(self, threshold):
+        """Positions dont la valeur est <= seuil"""
+        return self.positions[:np.searchsorted(self.values, threshold, side='right')]
+
+class FilterIndex:
+    """Index des filtres de recommandation, construits une fois par version.
+
+    - `by_category[filtre]` : valeur -> positions des formations (region, academie, departement)
+    - `capacity`, `pressure` : valeurs triées de capa_fin et du taux de pression
+    """
+
+    def __init__(self, frame, metrics):
+        self.size = len(frame)
+        self.by_category = {}
+        for name, column in CATEGORY_FILTERS.items():
+            if column in frame.columns:
+                self.by_category[name] = _positions_by_key(frame[column].tolist())
+        self.capacity = _SortedColumn(frame['capa_fin']) if 'capa_fin' in frame.columns else None
+        self.pressure = _SortedColumn(metrics['taux_pression'])
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Construit les index d'une version du jeu de données"""
+        return cls(dataset.frame, dataset.metrics)
+
+    def options(self, name):
+        """Valeurs proposées pour un filtre catégoriel (vide si la colonne est absente)"""
+        return tuple(sorted(self.by_category.get(name, {}), key=lambda value: str(value).casefold()))
+
+    def mask(self, region=None, academie=None, departement=None, min_capacity=None, max_pressure=None,
+             positions=None):
+        """Masque booléen des formations qui passent tous les filtres (None si aucun filtre).
+
+        positions : restriction à un ensemble de positions déjà calculé (recherche spatiale...).
+        """
+        selected = None
+
+        def restrict(positions):
+            nonlocal selected
+            keep = np.zeros(self.size, dtype=bool)
+            keep[positions] = True
+            selected = keep if selected is None else selected & keep
+
+        for name, values in (('region', region), ('academie', academie), ('departement', departement)):
+            if not values:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            index = self.by_category.get(name, {})
+            empty = np.empty(0, dtype=np.int64)
+            restrict(np.concatenate([index.get(value, empty) for value in values]))
+        if min_capacity is not None and self.capacity is not None:
+            restrict(self.capacity.at_least(min_capacity))
+        if max_pressure is not None:
+            restrict(self.pressure.at_most(max_pressure))
+        if positions is not None:
+            restrict(np.asarray(positions, dtype=np.int64))
+        return selected
+
+def filter_index(dataset):
+    """Index des filtres de la version, partagés par toutes les sessions"""
+    return dataset.cached('filter_index', FilterIndex.from_dataset)
+
+def profile_chances(dataset, profile, model=HEURISTIC_MODEL):
+    """Chances arrondies d'un profil pour toutes les formations, et l'ordre décroissant du cube s'il existe"""
+    if model == HEURISTIC_MODEL and dataset.is_shared and profile_in_cube(profile):
+        order, chances = dataset.cube.ranking(profile)
+        return chances, order
+    # Autre modèle, profil hors des 24 combinaisons de l'interface ou DataFrame ad hoc : calcul direct
+    return np.round(model_probabilities(dataset, [profile], model)[0], 1), None
+
+def distances_from(dataset, lat, lon):
+    """Distances (km) du point à toutes les formations, en un seul calcul vectorisé (NaN si non géolocalisée)"""
+    formation_lat, formation_lon = dataset.cached('coordinates', lambda dataset: formation_coordinates(dataset.frame))
+    return haversine_km(lat, lon, formation_lat, formation_lon)
+
+def combined_scores(chances, distances, weight, scale=DISTANCE_SCALE_KM):
+    """Score de classement (0-1) mêlant chances (%) et proximité : (1 - poids) · chances + poids · e^(-d / échelle)"""
+    proximity = np.nan_to_num(np.exp(-np.asarray(distances, dtype=np.float64) / scale))
+    return (1 - weight) * np.asarray(chances, dtype=np.float64) / 100 + weight * proximity
+
+def top_positions(values, k, candidates=None):
+    """Positions des k plus grandes valeurs (décroissantes), par sélection partielle.
+
+    Les NaN sont classés en dernier ; à valeur égale, la position la plus petite passe devant.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if candidates is None:
+        candidates = np.arange(len(values))
+    if k <= 0 or not len(candidates):
+        return candidates[:0]
+    keys = np.where(np.isnan(values[candidates]), np.inf, -values[candidates])
+    if k < len(candidates):
+        selected = np.argpartition(keys, k - 1)[:k]
+        # Les ex aequo de la k-ième valeur ne doivent pas dépendre de la partition
+        threshold = keys[selected].max()
+        selected = np.union1d(np.flatnonzero(keys < threshold), np.flatnonzero(keys == threshold)[:k])
+        candidates, keys = candidates[selected], keys[selected]
+    order = np.lexsort((candidates, keys))[:k]
+    return candidates[order]
+
+def recommend(dataset, profile, k=DEFAULT_TOP_K, values=None, model=HEURISTIC_MODEL, **filters):
+    """Positions des k meilleures formations pour un profil, sous filtres.
+
+    values : valeurs par position servant au classement (par défaut les chances du profil).
+    model : modèle de calcul des chances (voir parcoursup.models).
+    filters : region, academie, departement, min_capacity, max_pressure, positions (voir FilterIndex.mask).
+    Retourne (positions retenues, chances du profil pour toutes les formations).
+    """
+    chances, order = profile_chances(dataset, profile, model)
+    mask = filter_index(dataset).mask(**filters)
+
+    if values is None and order is not None:
+        # Ordre du cube déjà calculé : on ne garde que les formations filtrées
+        positions = order if mask is None else order[mask[order]]
+        return positions[:k], chances
+
+    candidates = None if mask is None else np.flatnonzero(mask)
+    return top_positions(chances if values is None else values, k, candidates), chances
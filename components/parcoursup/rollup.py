@@ -0,0 +1,148 @@
+"""Agrégats géographiques des formations : national, région, académie, département.
+
+Le cube est construit une fois par version. Chaque niveau est une table (une
+ligne par valeur) de sommes additives — formations, capacité, vœux,
+propositions, admis, admis boursiers, admises, admis par mention — calculées
+par `np.bincount` sur les codes des catégories, puis des taux qui s'en
+déduisent. Les niveaux fins gardent leur niveau parent (région d'une académie,
+académie d'un département) pour l'exploration descendante.
+"""
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.metrics import safe_ratio
+
+# Niveau -> colonne de regroupement
+ROLLUP_LEVELS = {
+    'region': 'region_etab_aff',
+    'academie': 'acad_mies',
+    'departement': 'dep_lib'
+}
+LEVEL_LABELS = {
+    'region': "Région",
+    'academie': "Académie",
+    'departement': "Département"
+}
+# Niveau parent de chaque niveau pour l'exploration descendante
+PARENT_LEVELS = {
+    'academie': 'region',
+    'departement': 'academie'
+}
+
+# Sommes additives : nom -> colonne de l'export
+SUM_COLUMNS = {
+    'capacite': 'capa_fin',
+    'voeux': 'voe_tot',
+    'propositions': 'prop_tot',
+    'admis': 'acc_tot'
+}
+# Admis par mention (la mention TB avec félicitations compte comme TB)
+MENTION_SUMS = {
+    'admis_sansmention': ('acc_sansmention',),
+    'admis_ab': ('acc_ab',),
+    'admis_b': ('acc_b',),
+    'admis_tb': ('acc_tb', 'acc_tbf')
+}
+
+def _column(frame, name):
+    if name not in frame.columns:
+        return np.zeros(len(frame))
+    return np.nan_to_num(frame[name].to_numpy(dtype=np.float64, na_value=np.nan))
+
+def _share_counts(frame, count_column, share_column):
+    """Effectif par formation, à défaut estimé par la part (en %) × admis"""
+    if count_column in frame.columns:
+        return _column(frame, count_column)
+    return _column(frame, share_column) / 100 * _column(frame, 'acc_tot')
+
+def formation_sums(frame):
+    """Grandeurs additives de chaque formation (une colonne par grandeur)"""
+    sums = {'formations': np.ones(len(frame))}
+    for name, column in SUM_COLUMNS.items():
+        sums[name] = _column(frame, column)
+    sums['admis_boursiers'] = _share_counts(frame, 'acc_brs', 'pct_bours')
+    sums['admises'] = _share_counts(frame, 'acc_tot_f', 'pct_f')
+    for name, columns in MENTION_SUMS.items():
+        sums[name] = sum(_column(frame, column) for column in columns)
+    return sums
+
+def add_rates(table):
+    """Ajoute les taux calculés à partir des sommes (en %, sauf la pression)"""
+    table['taux_proposition'] = safe_ratio(table['propositions'], table['voeux']) * 100
+    table['taux_pression'] = safe_ratio(table['voeux'], table['capacite'])
+    table['taux_remplissage'] = safe_ratio(table['admis'], table['capacite']) * 100
+    table['part_boursiers'] = safe_ratio(table['admis_boursiers'], table['admis']) * 100
+    table['part_femmes'] = safe_ratio(table['admises'], table['admis']) * 100
+    mentions = sum(table[name] for name in MENTION_SUMS)
+    for name in MENTION_SUMS:
+        table[name.replace('admis_', 'part_')] = safe_ratio(table[name], mentions) * 100
+    return table
+
+class GeoRollup:
+    """Tables agrégées de chaque niveau géographique et totaux nationaux"""
+
+    def __init__(self, frame):
+        sums = formation_sums(frame)
+        totals = add_rates({name: values.sum() for name, values in sums.items()})
+        self.totals = {name: float(value) for name, value in totals.items()}
+        # Totaux des colonnes de l'export avec leur type d'origine (affichage des cartes)
+        for name, column in SUM_COLUMNS.items():
+            if column in frame.columns:
+                self.totals[column] = frame[column].sum()
+
+        self.tables = {}
+        codes = {}
+        for level, column in ROLLUP_LEVELS.items():
+            if column not in frame.columns:
+                continue
+            series = frame[column]
+            if not hasattr(series, 'cat'):
+                series = series.astype('category')
+            level_codes = series.cat.codes.to_numpy(dtype=np.int64)
+            known = level_codes >= 0
+            size = len(series.cat.categories)
+            table = pd.DataFrame({
+                name: np.bincount(level_codes[known], weights=values[known], minlength=size)
+                for name, values in sums.items()
+            }, index=pd.Index(series.cat.categories, name=level))
+            # Effectifs entiers dans les tables (les effectifs estimés par une part restent décimaux)
+            for name in ('formations', *SUM_COLUMNS):
+                table[name] = table[name].round().astype(np.int64)
+            codes[level] = (level_codes, series.cat.categories)
+            self.tables[level] = table
+
+        # Niveau parent : celui de la première formation de chaque valeur
+        for level, parent in PARENT_LEVELS.items():
+            if level not in codes or parent not in codes:
+                continue
+            level_codes, categories = codes[level]
+            parent_codes, parent_categories = codes[parent]
+            first = np.full(len(categories), -1, dtype=np.int64)
+            positions = np.flatnonzero(level_codes >= 0)[::-1]
+            first[level_codes[positions]] = positions
+            parents = np.where(first >= 0, parent_codes[np.maximum(first, 0)], -1)
+            self.tables[level][parent] = [parent_categories[code] if code >= 0 else None for code in parents]
+
+        for level, table in self.tables.items():
+            # Valeurs absentes de la version (catégories inutilisées) retirées
+            self.tables[level] = add_rates(table[table['formations'] > 0].copy())
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Construit le cube d'une version du jeu de données"""
+        return cls(dataset.frame)
+
+    def levels(self):
+        """Niveaux disponibles dans cette version"""
+        return list(self.tables)
+
+    def table(self, level, parent=None):
+        """Table d'un niveau, restreinte aux valeurs d'un parent (région d'une académie...) si demandé"""
+        table = self.tables[level]
+        if parent is not None and PARENT_LEVELS.get(level) in table.columns:
+            table = table[table[PARENT_LEVELS[level]] == parent]
+        return table
+
+def geo_rollup(dataset):
+    """Cube géographique de la version, partagé par toutes les sessions"""
+    return dataset.cached('geo_rollup', GeoRollup.from_dataset)
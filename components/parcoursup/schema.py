@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+# Libellés très répétés : stockés en catégories
+LABEL_COLUMNS = (
+    'session',
+    'contrat_etab',
+    'dep',
+    'dep_lib',
+    'region_etab_aff',
+    'acad_mies',
+    'ville_etab',
+    'lib_for_voe_ins',
+    'select_form',
+    'fili',
+    'form_lib_voe_acc',
+    'fil_lib_voe_acc',
+    'lib_grp1',
+    'lib_grp2',
+    'lib_grp3',
+    'list_com',
+    'tri'
+)
+
+# Effectifs, rangs et pourcentages : entiers réduits au plus petit type sûr
+COUNT_PREFIXES = (
+    'capa_fin',
+    'voe_tot',
+    'nb_voe_',
+    'nb_cla_',
+    'prop_tot',
+    'acc_',
+    'pct_',
+    'ran_grp',
+    'taux_acces_',
+    'part_acces_'
+)
+
+GEO_COLUMN = 'g_olocalisation_des_formations'
+
+# Marge gardée au-dessus du maximum observé, pour que la somme de quelques
+# colonnes du même type ne déborde pas
+INTEGER_HEADROOM = 4
+INTEGER_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+def is_count_column(column):
+    """Indique si une colonne fait partie des effectifs déclarés"""
+    return column.startswith(COUNT_PREFIXES)
+
+def compact_count(series):
+    """Réduit une colonne d'effectifs au plus petit type entier sûr.
+
+    Les colonnes avec valeurs manquantes passent en float32 (exact jusqu'à
+    2^24) plutôt qu'en entier nullable, pour que NaN > 0 reste False dans les
+    calculs existants.
+    """
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().any():
+        return values.astype(np.float32)
+    if len(values) and (values != np.floor(values)).any():
+        return values.astype(np.float64)
+
+    low = values.min() if len(values) else 0
+    high = values.max() if len(values) else 0
+    for integer_type in INTEGER_TYPES:
+        limits = np.iinfo(integer_type)
+        if limits.min <= low * INTEGER_HEADROOM and high * INTEGER_HEADROOM <= limits.max:
+            return values.astype(integer_type)
+    return values.astype(np.int64)
+
+def split_coordinates(series):
+    """Aplatit la colonne de géolocalisation {lon, lat} en deux colonnes float32"""
+    def coordinate(value, key):
+        if isinstance(value, dict) and value.get(key) is not None:
+            return value[key]
+        return np.nan
+
+    lat = np.array([coordinate(value, 'lat') for value in series], dtype=np.float32)
+    lon = np.array([coordinate(value, 'lon') for value in series], dtype=np.float32)
+    return lat, lon
+
+def apply_schema(frame):
+    """Retourne une copie compacte du DataFrame des formations selon le schéma déclaré"""
+    columns = {}
+    for column in frame.columns:
+        series = frame[column]
+        if column == GEO_COLUMN:
+            columns['lat'], columns['lon'] = split_coordinates(series)
+        elif column in LABEL_COLUMNS:
+            columns[column] = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+        elif is_count_column(column):
+            columns[column] = series if series.dtype.kind in 'iuf' and series.dtype.itemsize < 8 else compact_count(series)
+        else:
+            columns[column] = series
+    return pd.DataFrame(columns, index=frame.index, copy=False)
+
+def memory_report(frame):
+    """Retourne l'empreinte mémoire de chaque colonne, de la plus lourde à la plus légère"""
+    usage = frame.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        'colonne': usage.index,
+        'type': [str(frame[column].dtype) for column in usage.index],
+        'octets': usage.values
+    })
+    report['part'] = (report['octets'] / max(report['octets'].sum(), 1) * 100).round(1)
+    return report.sort_values('octets', ascending=False, ignore_index=True)
+
+def main():
+    """Affiche le rapport mémoire du jeu de données compacté"""
+    from components.parcoursup.store import get_store
+
+    frame = get_store().get().frame
+    report = memory_report(frame)
+    print(report.to_string(index=False))
+    print(f"Total: {report['octets'].sum():,} octets pour {len(frame):,} formations")
+
+if __name__ == "__main__":
+    main()
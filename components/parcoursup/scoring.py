@@ -0,0 +1,81 @@
+"""Noyau de calcul partagé du modèle de prédiction.
+
+Un seul calcul pour l'interface détaillée, la comparaison globale et les
+outils hors ligne : un bloc de profils (bac, mention, boursier) contre un
+bloc de formations donne une matrice de probabilités profils × formations.
+"""
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.metrics import BAC_GROUPS, bac_group
+
+BAC_TYPES = ("Général", "Technologique", "DAEU")
+MENTIONS = ("Sans mention", "AB", "B", "TB")
+
+# Multiplicateur appliqué selon la mention au bac
+MENTION_BONUS = {
+    'Sans mention': 1.0,
+    'AB': 1.3,
+    'B': 1.6,
+    'TB': 2.0
+}
+DEFAULT_MENTION_BONUS = 1.0
+
+# Bonus boursier : 1 + max(taux de boursiers de la formation, 10 %)
+MIN_BOURSIER_BONUS = 0.1
+
+GROUP_ORDER = tuple(BAC_GROUPS)
+
+class ScoreResult:
+    """Probabilités (profils × formations) et facteurs qui les composent"""
+
+    def __init__(self, probabilities, base_rates, mention_bonus, boursier_bonus):
+        self.probabilities = probabilities
+        self.base_rates = base_rates
+        self.mention_bonus = mention_bonus
+        self.boursier_bonus = boursier_bonus
+
+def encode_profiles(profiles):
+    """Convertit des profils (liste de dicts ou DataFrame) en tableaux : groupe de bac, bonus mention, boursier"""
+    if isinstance(profiles, pd.DataFrame):
+        bac_types = profiles['bac_type'].tolist()
+        mentions = profiles['mention'].tolist()
+        boursiers = profiles['boursier'].tolist()
+    else:
+        bac_types = [profile['bac_type'] for profile in profiles]
+        mentions = [profile['mention'] for profile in profiles]
+        boursiers = [profile['boursier'] for profile in profiles]
+
+    group_positions = {group: position for position, group in enumerate(GROUP_ORDER)}
+    groups = np.array([group_positions[bac_group(bac_type)] for bac_type in bac_types], dtype=np.intp)
+    mention_bonus = np.array([MENTION_BONUS.get(mention, DEFAULT_MENTION_BONUS) for mention in mentions],
+                             dtype=np.float64)
+    boursier = np.array([bool(value) for value in boursiers], dtype=bool)
+    return groups, mention_bonus, boursier
+
+def base_rate_matrix(metrics):
+    """Taux de base par groupe de bac, empilés en tableau (groupes × formations)"""
+    return np.vstack([
+        np.atleast_1d(np.asarray(metrics[f'taux_base_{group}'], dtype=np.float64))
+        for group in GROUP_ORDER
+    ])
+
+def boursier_bonus_row(metrics):
+    """Bonus d'un candidat boursier pour chaque formation (fmax ignore les NaN comme max())"""
+    rates = np.atleast_1d(np.asarray(metrics['taux_boursiers'], dtype=np.float64))
+    return 1 + np.fmax(MIN_BOURSIER_BONUS, rates)
+
+def score_profiles(profiles, metrics):
+    """Calcule la matrice des probabilités (profils × formations) en une opération vectorisée.
+
+    metrics : indicateurs dérivés des formations (DataFrame de compute_metrics,
+    ou mapping colonne -> valeur pour une seule formation).
+    """
+    groups, mention_bonus, boursier = encode_profiles(profiles)
+    base_rates = base_rate_matrix(metrics)[groups]
+    boursier_bonus = np.where(boursier[:, None], boursier_bonus_row(metrics)[None, :], 1.0)
+
+    # Même ordre d'opérations que la formule historique : base × mention × boursier
+    probabilities = base_rates * mention_bonus[:, None] * boursier_bonus
+    probabilities = np.fmin(100, np.fmax(0, probabilities))
+    return ScoreResult(probabilities, base_rates, mention_bonus, boursier_bonus)
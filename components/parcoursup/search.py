@@ -0,0 +1,169 @@
+"""Recherche approchée des formations (saisie au fil de l'eau).
+
+Index construit une fois par version sur les libellés des formations, les
+villes, départements et académies. Les textes sont normalisés (accents, casse,
+ponctuation) puis découpés en mots :
+
+- vocabulaire trié, listes de formations par mot stockées bout à bout : tous
+  les mots qui commencent par le préfixe saisi forment une seule tranche ;
+- index des trigrammes du vocabulaire pour tolérer les fautes de frappe quand
+  aucun mot ne commence par le texte saisi.
+
+Le score d'une formation est la somme, sur les mots de la requête, de la
+meilleure correspondance (exacte > préfixe > trigrammes) pondérée par le
+champ ; les formations qui contiennent tous les mots passent devant.
+"""
+import numpy as np
+
+from components.parcoursup.gazetteer import normalise_name
+from components.parcoursup.index import LABEL_COLUMN
+from components.parcoursup.recommend import top_positions
+
+# Champ indexé -> poids dans le score
+SEARCH_FIELDS = {
+    'g_ea_lib_vx': 3.0,
+    'lib_comp_voe_ins': 2.0,
+    'ville_etab': 2.0,
+    'dep_lib': 1.0,
+    'acad_mies': 1.0
+}
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+TRIGRAM_SCORE = 0.6
+MIN_TRIGRAM_SIMILARITY = 0.4
+MAX_FUZZY_TOKENS = 20
+DEFAULT_LIMIT = 50
+
+def tokenize(text):
+    """Mots normalisés d'un texte (sans accents, en minuscules, ponctuation retirée)"""
+    folded = normalise_name(text)
+    return ''.join(character if character.isalnum() else ' ' for character in folded).split()
+
+def trigrams(token):
+    """Trigrammes d'un mot, bordé d'espaces pour donner du poids au début et à la fin"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class SearchIndex:
+    """Index de recherche sur les champs SEARCH_FIELDS d'une version du jeu de données"""
+
+    def __init__(self, frame):
+        self.size = len(frame)
+        postings = {}
+        for field, weight in SEARCH_FIELDS.items():
+            if field not in frame.columns:
+                continue
+            values = frame[field].tolist()
+            # Un libellé répété (catégorie) n'est découpé qu'une fois
+            tokens_of = {}
+            for position, value in enumerate(values):
+                if not isinstance(value, str):
+                    continue
+                tokens = tokens_of.get(value)
+                if tokens is None:
+                    tokens = tokens_of[value] = set(tokenize(value))
+                for token in tokens:
+                    token_postings = postings.setdefault(token, {})
+                    if token_postings.get(position, 0.0) < weight:
+                        token_postings[position] = weight
+
+        self.vocabulary = np.array(sorted(postings), dtype=object)
+        # Listes de formations bout à bout dans l'ordre du vocabulaire (format CSR)
+        lengths = [len(postings[token]) for token in self.vocabulary]
+        self.offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        self.documents = np.fromiter(
+            (position for token in self.vocabulary for position in postings[token]),
+            dtype=np.int64, count=int(self.offsets[-1]))
+        self.weights = np.fromiter(
+            (weight for token in self.vocabulary for weight in postings[token].values()),
+            dtype=np.float64, count=int(self.offsets[-1]))
+
+        # Trigrammes -> identifiants de mots (format CSR)
+        by_trigram = {}
+        self.trigram_counts = np.zeros(len(self.vocabulary), dtype=np.int64)
+        for token_id, token in enumerate(self.vocabulary):
+            token_trigrams = trigrams(token)
+            self.trigram_counts[token_id] = len(token_trigrams)
+            for trigram in token_trigrams:
+                by_trigram.setdefault(trigram, []).append(token_id)
+        self.trigram_ids = {trigram: number for number, trigram in enumerate(by_trigram)}
+        self.trigram_offsets = np.concatenate(
+            ([0], np.cumsum([len(ids) for ids in by_trigram.values()]))).astype(np.int64)
+        self.trigram_tokens = np.fromiter(
+            (token_id for ids in by_trigram.values() for token_id in ids),
+            dtype=np.int64, count=int(self.trigram_offsets[-1]))
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Construit l'index d'une version du jeu de données"""
+        return cls(dataset.frame)
+
+    def _accumulate(self, best, start, end, score):
+        """Meilleur score par formation pour les mots [start, end) du vocabulaire"""
+        begin, finish = self.offsets[start], self.offsets[end]
+        if finish > begin:
+            np.maximum.at(best, self.documents[begin:finish], self.weights[begin:finish] * score)
+
+    def _fuzzy_tokens(self, token):
+        """Mots du vocabulaire proches par les trigrammes : (identifiants, similarités)"""
+        query_trigrams = [self.trigram_ids[trigram] for trigram in trigrams(token) if trigram in self.trigram_ids]
+        if not query_trigrams:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        matches = np.concatenate([
+            self.trigram_tokens[self.trigram_offsets[number]:self.trigram_offsets[number + 1]]
+            for number in query_trigrams
+        ])
+        shared = np.bincount(matches, minlength=len(self.vocabulary))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(trigrams(token)) + self.trigram_counts[candidates] - shared[candidates])
+        keep = similarity >= MIN_TRIGRAM_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        if len(candidates) > MAX_FUZZY_TOKENS:
+            best = np.argpartition(-similarity, MAX_FUZZY_TOKENS - 1)[:MAX_FUZZY_TOKENS]
+            candidates, similarity = candidates[best], similarity[best]
+        return candidates, similarity
+
+    def token_scores(self, token):
+        """Score de chaque formation pour un mot de la requête (0 si aucune correspondance)"""
+        best = np.zeros(self.size)
+        start = int(np.searchsorted(self.vocabulary, token, side='left'))
+        end = int(np.searchsorted(self.vocabulary, token + '￿', side='left'))
+        if end > start:
+            # Préfixe sur toute la tranche, puis correspondance exacte (premier mot de la tranche)
+            self._accumulate(best, start, end, PREFIX_SCORE)
+            if self.vocabulary[start] == token:
+                self._accumulate(best, start, start + 1, EXACT_SCORE)
+        elif len(token) >= 3:
+            for token_id, similarity in zip(*self._fuzzy_tokens(token)):
+                self._accumulate(best, token_id, token_id + 1, TRIGRAM_SCORE * similarity)
+        return best
+
+    def scores(self, query):
+        """Score de chaque formation pour la requête (tableau de taille formations)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return np.zeros(self.size)
+        total = np.zeros(self.size)
+        matched = np.zeros(self.size, dtype=np.int64)
+        for token in tokens:
+            token_score = self.token_scores(token)
+            total += token_score
+            matched += token_score > 0
+        # Toutes les correspondances complètes avant les partielles
+        return np.where(total > 0, matched * 1000.0 + total, 0.0)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Positions des meilleures formations pour la requête, par score décroissant"""
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        return top_positions(scores, limit, candidates)
+
+def search_index(dataset):
+    """Index de recherche de la version, partagé par toutes les sessions"""
+    return dataset.cached('search_index', SearchIndex.from_dataset)
+
+def search_labels(dataset, query, limit=DEFAULT_LIMIT):
+    """Libellés des formations trouvées, par pertinence et sans doublons (pour une selectbox)"""
+    positions = search_index(dataset).search(query, limit)
+    labels = dataset.frame[LABEL_COLUMN].to_numpy(dtype=object)[positions]
+    return tuple(dict.fromkeys(label for label in labels if isinstance(label, str)))
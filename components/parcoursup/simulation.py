@@ -0,0 +1,89 @@
+"""Simulation Monte-Carlo d'une liste de vœux.
+
+Chaque tirage décide, pour chaque vœu, si le candidat reçoit une proposition
+(tirages indépendants, probabilité donnée par le modèle). Les tirages sont
+faits par blocs de matrices (tirages × vœux) : mémoire bornée, aucune boucle
+Python par tirage. Le générateur est initialisable (`seed`) et les blocs
+peuvent être répartis dans un pool de processus, chaque bloc ayant son propre
+flux aléatoire dérivé de la même graine.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from components.parcoursup.cube import profile_in_cube, profile_position
+from components.parcoursup.models import HEURISTIC_MODEL, model_probabilities
+
+MAX_VOEUX = 10
+DEFAULT_DRAWS = 100_000
+# Nombre de tirages par bloc (matrice tirages × vœux en mémoire)
+BLOCK_DRAWS = 50_000
+
+class SimulationResult:
+    """Résultats agrégés d'une simulation.
+
+    - `p_any` : probabilité de recevoir au moins une proposition
+    - `expected_offers` : nombre moyen de propositions
+    - `offers_distribution[n]` : probabilité de recevoir exactement n propositions
+    - `best_offer_distribution[i]` : probabilité que le vœu i (ordre de préférence)
+      soit la meilleure proposition reçue
+    """
+
+    def __init__(self, draws, offer_counts, best_counts):
+        self.draws = draws
+        self.offers_distribution = offer_counts / draws
+        self.best_offer_distribution = best_counts / draws
+        self.p_any = 1 - self.offers_distribution[0]
+        self.expected_offers = float(np.dot(np.arange(len(offer_counts)), self.offers_distribution))
+
+    @property
+    def p_any_stderr(self):
+        """Erreur type de l'estimation de p_any"""
+        return float(np.sqrt(self.p_any * (1 - self.p_any) / self.draws))
+
+def profile_probabilities(dataset, profile, positions, model=HEURISTIC_MODEL):
+    """Probabilités (0-1) d'un profil pour les formations aux positions données"""
+    positions = np.asarray(positions, dtype=np.int64)
+    if model == HEURISTIC_MODEL and dataset.is_shared and profile_in_cube(profile):
+        row = dataset.cube.probabilities[profile_position(profile)]
+    else:
+        row = model_probabilities(dataset, [profile], model)[0]
+    return row[positions] / 100
+
+def simulate_block(probabilities, draws, seed):
+    """Tire un bloc et retourne (comptes par nombre de propositions, comptes par meilleure proposition)"""
+    rng = np.random.default_rng(seed)
+    voeux = len(probabilities)
+    offers = rng.random((draws, voeux)) < probabilities
+    offer_counts = np.bincount(offers.sum(axis=1), minlength=voeux + 1)
+    # Meilleure proposition : premier vœu accepté dans l'ordre de préférence
+    received = offers.any(axis=1)
+    best_counts = np.bincount(offers[received].argmax(axis=1), minlength=voeux)
+    return offer_counts, best_counts
+
+def simulate_voeux(probabilities, draws=DEFAULT_DRAWS, seed=None, workers=None):
+    """Simule une liste de vœux (probabilités 0-1 dans l'ordre de préférence).
+
+    workers : nombre de processus (None ou 1 : calcul dans le processus courant).
+    """
+    probabilities = np.clip(np.asarray(probabilities, dtype=np.float64), 0, 1)
+    if len(probabilities) > MAX_VOEUX:
+        raise ValueError(f"Une liste compte au plus {MAX_VOEUX} vœux")
+    if draws <= 0:
+        raise ValueError("Le nombre de tirages doit être positif")
+
+    sizes = [BLOCK_DRAWS] * (draws // BLOCK_DRAWS)
+    if draws % BLOCK_DRAWS:
+        sizes.append(draws % BLOCK_DRAWS)
+    # Un flux aléatoire indépendant par bloc : résultat identique quel que soit le nombre de processus
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers and workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+            blocks = list(pool.map(simulate_block, [probabilities] * len(sizes), sizes, seeds))
+    else:
+        blocks = [simulate_block(probabilities, size, block_seed) for size, block_seed in zip(sizes, seeds)]
+
+    offer_counts = np.sum([block[0] for block in blocks], axis=0)
+    best_counts = np.sum([block[1] for block in blocks], axis=0)
+    return SimulationResult(draws, offer_counts, best_counts)
@@ -0,0 +1,209 @@
+"""Snapshot colonnaire binaire du jeu de données Parcoursup.
+
+Un snapshot est un dossier contenant un fichier `.npy` par colonne et un
+`manifest.json` décrivant les colonnes. Les colonnes numériques sont chargées
+en mémoire partagée (`np.load(mmap_mode='r')`) : le démarrage ne parse plus de
+JSON et les processus qui lisent le même snapshot partagent les pages.
+
+Construction :
+    python -m components.parcoursup.snapshot [.data/parcoursup.json] [.data/parcoursup.snapshot]
+"""
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.schema import apply_schema
+from components.parcoursup.store import DATA_DIR, DEFAULT_SOURCE, file_digest, file_signature, read_json_frame
+
+DEFAULT_SNAPSHOT = DATA_DIR / "parcoursup.snapshot"
+MANIFEST_NAME = "manifest.json"
+# Correspondance des lignes avec la version précédente, écrite par une mise à jour incrémentale
+PATCH_NAME = "reuse.npy"
+FORMAT_VERSION = 1
+
+def _encode_column(series):
+    """Convertit une colonne en (tableau numpy, description du manifest)"""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy()
+        return values, {'kind': 'numeric', 'dtype': values.dtype.str}
+
+    # Colonnes texte ou objets (dict de géolocalisation...) : codes + catégories
+    is_text = all(isinstance(value, str) for value in series.dropna())
+    labels = series if is_text else series.map(
+        lambda value: None if value is None else json.dumps(value, ensure_ascii=False)
+    )
+    codes, categories = pd.factorize(labels, use_na_sentinel=True)
+    codes = codes.astype(np.int32)
+    return codes, {
+        'kind': 'category' if is_text else 'json',
+        'categories': [str(category) for category in categories]
+    }
+
+def _decode_column(values, spec):
+    """Reconstruit une colonne du DataFrame depuis son tableau et sa description"""
+    if spec['kind'] == 'numeric':
+        return values
+    categories = spec['categories']
+    if spec['kind'] == 'category':
+        return pd.Categorical.from_codes(np.asarray(values), categories=categories)
+    decoded = [json.loads(category) for category in categories]
+    return pd.Series([decoded[code] if code >= 0 else None for code in values], dtype=object)
+
+def _reuse_file(source, target):
+    """Reprend le fichier d'une colonne inchangée (lien physique, copie à défaut)"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def write_snapshot(frame, target=DEFAULT_SNAPSHOT, source_digest=None, reused=None, patch=None, replaces=None):
+    """Écrit un DataFrame sous forme de snapshot colonnaire.
+
+    Les fichiers sont écrits dans un sous-dossier propre à cette version puis le
+    manifest est remplacé atomiquement : un lecteur voit soit l'ancienne, soit
+    la nouvelle version, jamais un mélange des deux.
+
+    reused : colonne -> (fichier, description) d'une version précédente à reprendre tel quel
+    patch : {'base': version précédente, 'reuse': position reprise de chaque ligne (-1 sinon)}
+    replaces : empreinte du JSON que `source_digest` va remplacer (publication en cours)
+    """
+    target = Path(target)
+    target.mkdir(parents=True, exist_ok=True)
+    reused = reused or {}
+
+    version_name = source_digest or f"build-{os.getpid()}-{len(frame)}"
+    version_dir = target / version_name
+    tmp_dir = target / f".{version_name}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    columns = []
+    for position, column in enumerate(frame.columns):
+        filename = f"{position:03d}.npy"
+        if column in reused:
+            source, spec = reused[column]
+            _reuse_file(source, tmp_dir / filename)
+            spec = {key: value for key, value in spec.items() if key not in ('name', 'file')}
+        else:
+            values, spec = _encode_column(frame[column])
+            np.save(tmp_dir / filename, np.ascontiguousarray(values), allow_pickle=False)
+        columns.append({'name': column, 'file': filename, **spec})
+
+    patch_spec = None
+    if patch is not None:
+        np.save(tmp_dir / PATCH_NAME, np.asarray(patch['reuse'], dtype=np.int64), allow_pickle=False)
+        patch_spec = {'base': patch['base'], 'reuse': PATCH_NAME}
+
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.replace(tmp_dir, version_dir)
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'rows': len(frame),
+        'source_digest': source_digest,
+        'replaces': replaces,
+        'directory': version_name,
+        'columns': columns,
+        'patch': patch_spec
+    }
+    tmp_manifest = target / f".{MANIFEST_NAME}.tmp"
+    with open(tmp_manifest, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, ensure_ascii=False)
+    os.replace(tmp_manifest, target / MANIFEST_NAME)
+
+    # Les anciennes versions peuvent être supprimées : les pages déjà mappées
+    # par d'autres processus restent valides jusqu'à leur fermeture
+    for entry in target.iterdir():
+        if entry.is_dir() and entry.name != version_name and not entry.name.startswith('.'):
+            shutil.rmtree(entry, ignore_errors=True)
+    return target / MANIFEST_NAME
+
+def build_snapshot(source=DEFAULT_SOURCE, target=DEFAULT_SNAPSHOT):
+    """Convertit l'export JSON en snapshot colonnaire, déjà au schéma compact"""
+    frame = apply_schema(read_json_frame(source))
+    return write_snapshot(frame, target, source_digest=file_digest(source))
+
+def _manifest_path(path):
+    path = Path(path)
+    return path if path.name == MANIFEST_NAME else path / MANIFEST_NAME
+
+def read_manifest(path=DEFAULT_SNAPSHOT):
+    """Manifest d'un snapshot (dossier ou chemin du manifest)"""
+    with open(_manifest_path(path), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def read_patch(path=DEFAULT_SNAPSHOT):
+    """(version, version de base, correspondance des lignes) d'un snapshot ; base et correspondance à None
+    si le snapshot n'est pas une mise à jour incrémentale"""
+    manifest_path = _manifest_path(path)
+    manifest = read_manifest(manifest_path)
+    patch = manifest.get('patch')
+    if not patch:
+        return manifest['directory'], None, None
+    reuse = np.load(manifest_path.parent / manifest['directory'] / patch['reuse'], allow_pickle=False)
+    return manifest['directory'], patch['base'], reuse
+
+def load_snapshot(path=DEFAULT_SNAPSHOT):
+    """Charge un snapshot en mappant les colonnes numériques en mémoire"""
+    manifest_path = _manifest_path(path)
+    manifest = read_manifest(manifest_path)
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f"Format de snapshot non supporté: {manifest.get('format')}")
+
+    version_dir = manifest_path.parent / manifest['directory']
+    columns = {}
+    for spec in manifest['columns']:
+        values = np.load(version_dir / spec['file'], mmap_mode='r', allow_pickle=False)
+        columns[spec['name']] = _decode_column(values, spec)
+    # copy=False garde les tableaux mappés au lieu de les consolider en mémoire
+    return pd.DataFrame(columns, copy=False)
+
+# Empreinte des fichiers sources, recalculée seulement quand leur signature (mtime, taille) change
+_source_digests = {}
+
+def _source_digest(source):
+    key = (source.resolve(), file_signature(source))
+    digest = _source_digests.get(key)
+    if digest is None:
+        digest = file_digest(source)
+        _source_digests.clear()
+        _source_digests[key] = digest
+    return digest
+
+def snapshot_is_fresh(source=DEFAULT_SOURCE, target=DEFAULT_SNAPSHOT, pending=False):
+    """Indique si le snapshot existe et a été construit à partir du contenu actuel du fichier JSON
+
+    Le manifest garde l'empreinte de sa source : un snapshot issu d'un autre
+    fichier (CSV nettoyé...) ou d'une ancienne version du JSON n'est jamais servi,
+    quelles que soient les dates de modification.
+
+    pending : accepte aussi un snapshot écrit pour remplacer le JSON actuel
+    (`replaces`), entre l'écriture du snapshot et la publication du JSON.
+    """
+    manifest_path = Path(target) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return False
+    source = Path(source)
+    if not source.exists():
+        return True
+    manifest = read_manifest(manifest_path)
+    digest = _source_digest(source)
+    if manifest.get('source_digest') is not None and manifest['source_digest'] == digest:
+        return True
+    return pending and manifest.get('replaces') is not None and manifest['replaces'] == digest
+
+def main(argv=None):
+    """Point d'entrée en ligne de commande"""
+    argv = sys.argv[1:] if argv is None else argv
+    source = Path(argv[0]) if len(argv) > 0 else DEFAULT_SOURCE
+    target = Path(argv[1]) if len(argv) > 1 else DEFAULT_SNAPSHOT
+    manifest_path = build_snapshot(source, target)
+    print(f"Snapshot écrit: {manifest_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Index spatial des formations : recherches par rayon, k plus proches et rectangle.
+
+Les coordonnées (lat, lon) sont projetées sur la sphère unité ; un arbre k-d
+sur ces points 3D donne les voisins au sens de la distance orthodromique (la
+corde est une fonction croissante de l'arc). L'arbre est construit une fois
+par version du jeu de données ; chaque requête descend l'arbre en élaguant les
+nœuds dont la boîte englobante est trop loin, puis teste les feuilles par
+blocs vectorisés.
+"""
+import heapq
+
+import numpy as np
+
+from components.parcoursup.geo import EARTH_RADIUS_KM, formation_coordinates
+
+LEAF_SIZE = 32
+
+def unit_vectors(lat, lon):
+    """Points (n × 3) de la sphère unité pour des coordonnées en degrés"""
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def chord_for_km(km):
+    """Longueur de corde (sphère unité) correspondant à une distance orthodromique"""
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+def km_for_chord(chord):
+    """Distance orthodromique (km) correspondant à une longueur de corde"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+class SpatialIndex:
+    """Arbre k-d (sur la sphère) des formations géolocalisées et tri par latitude.
+
+    Les formations sans coordonnées ne sont jamais retournées.
+    """
+
+    def __init__(self, lat, lon, leaf_size=LEAF_SIZE):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        known = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        self.lat, self.lon = lat, lon
+        self.positions = known
+        points = unit_vectors(lat[known], lon[known])
+
+        # Nœuds : [début, fin) dans self.order, boîte englobante, enfants (-1 pour une feuille)
+        order = np.arange(len(known))
+        starts, ends, lows, highs, children = [], [], [], [], []
+        pending = [(0, len(known), None, 0)]
+        while pending:
+            start, end, parent, side = pending.pop()
+            node = len(starts)
+            if parent is not None:
+                children[parent][side] = node
+            block = points[order[start:end]]
+            starts.append(start)
+            ends.append(end)
+            lows.append(block.min(axis=0) if len(block) else np.zeros(3))
+            highs.append(block.max(axis=0) if len(block) else np.zeros(3))
+            children.append([-1, -1])
+            if end - start <= leaf_size:
+                continue
+            # Coupe à la médiane de l'axe le plus étendu
+            axis = int(np.argmax(highs[node] - lows[node]))
+            middle = (end - start) // 2
+            split = np.argpartition(block[:, axis], middle)
+            order[start:end] = order[start:end][split]
+            pending.append((start, start + middle, node, 0))
+            pending.append((start + middle, end, node, 1))
+
+        self.order = order
+        self.points = points
+        self.starts = np.array(starts, dtype=np.int64)
+        self.ends = np.array(ends, dtype=np.int64)
+        self.lows = np.array(lows).reshape(-1, 3)
+        self.highs = np.array(highs).reshape(-1, 3)
+        self.children = np.array(children, dtype=np.int64).reshape(-1, 2)
+
+        # Tri par latitude pour les requêtes rectangulaires
+        self.by_lat = known[np.argsort(lat[known], kind='stable')]
+        self.sorted_lat = lat[self.by_lat]
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """Construit l'index d'une version du jeu de données"""
+        return cls(*formation_coordinates(dataset.frame))
+
+    def _box_distance(self, node, query):
+        """Distance (corde) du point à la boîte englobante d'un nœud"""
+        gap = np.maximum(np.maximum(self.lows[node] - query, query - self.highs[node]), 0)
+        return float(np.sqrt(gap @ gap))
+
+    def _leaf(self, node, query):
+        members = self.order[self.starts[node]:self.ends[node]]
+        return members, np.sqrt(((self.points[members] - query) ** 2).sum(axis=1))
+
+    def radius(self, lat, lon, km):
+        """Formations à moins de `km` du point : (positions, distances en km) par distance croissante"""
+        if not len(self.positions):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        query = unit_vectors([lat], [lon])[0]
+        limit = chord_for_km(km)
+        found, chords = [], []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_distance(node, query) > limit:
+                continue
+            left, right = self.children[node]
+            if left < 0:
+                members, distances = self._leaf(node, query)
+                keep = distances <= limit
+                found.append(members[keep])
+                chords.append(distances[keep])
+            else:
+                stack.extend((left, right))
+        members = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        chords = np.concatenate(chords) if chords else np.empty(0)
+        order = np.argsort(chords, kind='stable')
+        return self.positions[members[order]], km_for_chord(chords[order])
+
+    def nearest(self, lat, lon, k=10):
+        """k formations les plus proches : (positions, distances en km) par distance croissante"""
+        if not len(self.positions) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        query = unit_vectors([lat], [lon])[0]
+        # Nœuds à visiter par distance croissante ; meilleurs candidats en tas max (distances négatives)
+        nodes = [(0.0, 0)]
+        best = []
+        while nodes:
+            distance, node = heapq.heappop(nodes)
+            if len(best) == k and distance > -best[0][0]:
+                break
+            left, right = self.children[node]
+            if left >= 0:
+                for child in (left, right):
+                    heapq.heappush(nodes, (self._box_distance(child, query), child))
+                continue
+            members, distances = self._leaf(node, query)
+            for member, member_distance in zip(members.tolist(), distances.tolist()):
+                if len(best) < k:
+                    heapq.heappush(best, (-member_distance, member))
+                elif member_distance < -best[0][0]:
+                    heapq.heapreplace(best, (-member_distance, member))
+        best.sort(key=lambda item: (-item[0], item[1]))
+        members = np.array([member for _, member in best], dtype=np.int64)
+        chords = np.array([-distance for distance, _ in best])
+        return self.positions[members], km_for_chord(chords)
+
+    def bbox(self, min_lat, max_lat, min_lon, max_lon):
+        """Positions des formations dans un rectangle (min_lon > max_lon : traversée de l'antiméridien)"""
+        start = np.searchsorted(self.sorted_lat, min_lat, side='left')
+        end = np.searchsorted(self.sorted_lat, max_lat, side='right')
+        candidates = self.by_lat[start:end]
+        lon = self.lon[candidates]
+        if min_lon <= max_lon:
+            keep = (lon >= min_lon) & (lon <= max_lon)
+        else:
+            keep = (lon >= min_lon) | (lon <= max_lon)
+        return np.sort(candidates[keep])
+
+def spatial_index(dataset):
+    """Index spatial de la version, partagé par toutes les sessions"""
+    return dataset.cached('spatial_index', SpatialIndex.from_dataset)
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+import weakref
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.cube import ProbabilityCube
+from components.parcoursup.index import FormationIndex
+from components.parcoursup.metrics import compute_metrics
+from components.parcoursup.schema import apply_schema
+
+# Dossier des données à la racine du projet
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / ".data"
+DEFAULT_SOURCE = DATA_DIR / "parcoursup.json"
+
+def file_signature(path):
+    """Retourne la signature rapide (mtime, taille) d'un fichier"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def file_digest(path):
+    """Calcule l'empreinte SHA-1 du contenu d'un fichier, bloc par bloc"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_json_frame(path):
+    """Lit l'export Parcoursup JSON et construit le DataFrame des formations"""
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    return pd.DataFrame(data['results'])
+
+class Dataset:
+    """Version figée du jeu de données, partagée par toutes les sessions.
+
+    Le DataFrame `frame` est le même objet pour tout le processus : il ne doit
+    jamais être modifié en place (faire une copie avant toute transformation).
+    Les index de recherche et les indicateurs dérivés sont calculés une seule
+    fois, au chargement.
+    """
+
+    def __init__(self, frame, source=None, digest=None, version=0, metrics=None, index=None):
+        self.frame = frame
+        self.source = Path(source) if source is not None else None
+        self.digest = digest
+        self.version = version
+        self.index = FormationIndex(frame) if index is None else index
+        self.metrics = compute_metrics(frame) if metrics is None else metrics
+        # Tables dérivées construites à la première demande, une fois par version
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    @property
+    def is_shared(self):
+        """Vrai pour une version chargée par un store (faux pour un Dataset détaché, à usage unique)"""
+        return self.version > 0
+
+    def cached(self, name, build):
+        """Retourne la table dérivée `name`, construite une seule fois par `build(dataset)`"""
+        value = self._cache.get(name)
+        if value is None:
+            with self._cache_lock:
+                value = self._cache.get(name)
+                if value is None:
+                    value = build(self)
+                    self._cache[name] = value
+        return value
+
+    def cached_value(self, name):
+        """Table dérivée `name` si elle a déjà été construite (None sinon)"""
+        return self._cache.get(name)
+
+    @property
+    def cube(self):
+        """Cube des probabilités des 24 profils, recalculé à chaque nouvelle version"""
+        return self.cached('cube', ProbabilityCube.from_dataset)
+
+    def take(self, positions):
+        """Dataset restreint aux formations `positions` (triées), sans recalcul des tables de la version.
+
+        Le DataFrame, les indicateurs et le cube sont découpés par position ; la
+        restriction garde la version de son parent et ses tables dérivées sont
+        construites à la demande, comme pour toute version.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        frame = self.frame.iloc[positions].reset_index(drop=True)
+        metrics = self.metrics.iloc[positions].reset_index(drop=True)
+        subset = Dataset(frame, self.source, self.digest, self.version, metrics)
+        subset._cache['cube'] = self.cube.take(positions)
+        if self.is_shared:
+            _live_datasets[id(frame)] = subset
+        return subset
+
+    def row(self, label):
+        """Retourne la ligne de la formation portant ce libellé, sans parcourir le DataFrame"""
+        return self.frame.iloc[self.index.position(label)]
+
+    def metrics_row(self, position):
+        """Indicateurs dérivés d'une formation, avec le type d'origine de chaque colonne"""
+        return {name: values.iat[position] for name, values in self.metrics.items()}
+
+class DatasetStore:
+    """Charge un fichier de données une seule fois par processus.
+
+    Chaque accès compare la signature (mtime, taille) du fichier à celle du
+    dernier chargement ; si elle a changé, l'empreinte du contenu décide s'il
+    faut vraiment relire le fichier.
+    """
+
+    def __init__(self, source=DEFAULT_SOURCE, loader=read_json_frame, patch_reader=None):
+        self.source = Path(source)
+        self.loader = loader
+        # patch_reader(source) -> (version, version de base, correspondance des lignes) : fournie par
+        # les snapshots mis à jour incrémentalement, elle évite de comparer les deux versions
+        self.patch_reader = patch_reader
+        self._lock = threading.Lock()
+        # (signature, Dataset) lus et remplacés ensemble
+        self._state = (None, None)
+        self._version = 0
+        self._patch_version = None
+
+    @property
+    def version(self):
+        """Numéro de la version actuellement chargée (0 si rien n'est chargé)"""
+        return self._version
+
+    def get(self, warm=None):
+        """Retourne le Dataset courant, en le rechargeant si le fichier a changé
+
+        warm : fonction appelée sur une nouvelle version avant de la publier (construction
+        des tables dérivées hors du chemin des requêtes)
+        """
+        signature = file_signature(self.source)
+        current_signature, dataset = self._state
+        if dataset is not None and signature == current_signature:
+            return dataset
+
+        with self._lock:
+            current_signature, dataset = self._state
+            if dataset is not None and signature == current_signature:
+                return dataset
+
+            digest = file_digest(self.source)
+            if dataset is not None and digest == dataset.digest:
+                # Fichier touché mais contenu identique : pas de rechargement
+                self._state = (signature, dataset)
+                return dataset
+
+            patch_version, base, reuse = self.patch_reader(self.source) if self.patch_reader else (None, None, None)
+            frame = apply_schema(self.loader(self.source))
+            if self.patch_reader and self.patch_reader(self.source)[0] != patch_version:
+                # Snapshot remplacé pendant la lecture : la correspondance lue ne vaut pas pour ces données
+                patch_version, base, reuse = None, None, None
+            spliced = None
+            if dataset is not None:
+                # Nouvelle version : seules les lignes ajoutées ou modifiées sont recalculées
+                from components.parcoursup.delta import frame_reuse, splice_dataset
+                if reuse is None or base is None or base != self._patch_version:
+                    reuse = frame_reuse(dataset, frame)
+                if reuse is not None:
+                    spliced = splice_dataset(dataset, frame, reuse)
+            self._patch_version = patch_version
+
+            self._version += 1
+            if spliced is None:
+                dataset = Dataset(frame, self.source, digest, self._version)
+            else:
+                metrics, index, cube = spliced
+                dataset = Dataset(frame, self.source, digest, self._version, metrics, index)
+                if cube is not None:
+                    dataset._cache['cube'] = cube
+            if warm is not None:
+                warm(dataset)
+            _live_datasets[id(frame)] = dataset
+            # Bascule atomique : les sessions voient l'ancienne ou la nouvelle version entière
+            self._state = (signature, dataset)
+            _bump_data_version()
+            return dataset
+
+    def invalidate(self):
+        """Force le rechargement au prochain accès"""
+        with self._lock:
+            self._state = (None, None)
+
+# Un store par fichier source, partagé par tout le processus
+_stores = {}
+_stores_lock = threading.Lock()
+
+# Datasets chargés encore référencés, retrouvés à partir de leur DataFrame
+_live_datasets = weakref.WeakValueDictionary()
+
+# Compteur global incrémenté à chaque nouvelle version chargée, clé possible pour les caches
+_data_version = 0
+_data_version_lock = threading.Lock()
+
+def _bump_data_version():
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+
+def data_version():
+    """Numéro global de version des données, incrémenté à chaque rechargement d'un store"""
+    return _data_version
+
+def iter_stores():
+    """Liste des stores partagés enregistrés dans le processus"""
+    with _stores_lock:
+        return list(_stores.values())
+
+def get_store(source=DEFAULT_SOURCE, loader=read_json_frame, patch_reader=None):
+    """Retourne le store partagé associé à un fichier source et à sa méthode de lecture"""
+    path = Path(source).resolve()
+    key = (path, loader)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = DatasetStore(path, loader, patch_reader)
+            _stores[key] = store
+        return store
+
+def dataset_for(frame):
+    """Retrouve le Dataset chargé d'un DataFrame, ou en construit un détaché pour un DataFrame ad hoc"""
+    dataset = _live_datasets.get(id(frame))
+    if dataset is not None and dataset.frame is frame:
+        return dataset
+    return Dataset(frame)
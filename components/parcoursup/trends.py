@@ -0,0 +1,178 @@
+"""Évolution des formations d'une session Parcoursup à l'autre.
+
+Les sessions du store partitionné sont alignées sur les formations de la
+session la plus récente : d'abord par `cod_aff_form`, puis, pour une formation
+dont le code a changé, par établissement (`cod_uai`) et intitulé
+(`lib_for_voe_ins`) quand ce couple est unique. Chaque indicateur devient un
+tableau (formations × sessions), NaN quand la formation n'existait pas.
+
+Les évolutions d'une session à l'autre et la projection de la pression de la
+session suivante (droite des moindres carrés sur les sessions connues,
+calculée pour toutes les formations à la fois) sont matérialisées une fois par
+combinaison de fichiers des partitions (signatures mtime, taille) : tant
+qu'aucun fichier ne change, les tables sont servies sans charger de partition
+et l'interface lit l'historique d'une formation sans jointure.
+"""
+import numpy as np
+import pandas as pd
+
+from components.parcoursup.metrics import safe_ratio
+from components.parcoursup.partitions import get_partitioned_store
+
+# Indicateur -> libellé
+TREND_MEASURES = {
+    'capacite': "Capacité",
+    'voeux': "Vœux",
+    'taux_pression': "Taux de pression",
+    'taux_acces': "Taux d'accès (%)"
+}
+# Évolutions exprimées en % (les taux sont comparés en points)
+RELATIVE_MEASURES = ('capacite', 'voeux')
+
+def _column(frame, name):
+    if name not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return frame[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def session_measures(frame):
+    """Indicateurs suivis d'une session (une colonne par indicateur)"""
+    capacity, wishes = _column(frame, 'capa_fin'), _column(frame, 'voe_tot')
+    pressure = safe_ratio(wishes, capacity)
+    # Pression inconnue (capacité absente) plutôt que nulle
+    pressure[~(capacity > 0)] = np.nan
+    return {
+        'capacite': capacity,
+        'voeux': wishes,
+        'taux_pression': pressure,
+        'taux_acces': _column(frame, 'taux_acces_ens')
+    }
+
+def _fallback_keys(frame):
+    """Clés (cod_uai, lib_for_voe_ins) de chaque formation, ou None si les colonnes manquent"""
+    if 'cod_uai' not in frame.columns or 'lib_for_voe_ins' not in frame.columns:
+        return None
+    return list(zip(frame['cod_uai'].astype(str), frame['lib_for_voe_ins'].astype(str)))
+
+def align_positions(reference, dataset):
+    """Position dans `reference` de chaque formation de `dataset` (-1 si elle n'y figure pas)"""
+    frame = dataset.frame
+    aligned = np.full(len(frame), -1, dtype=np.int64)
+    by_aff_form = reference.index.by_aff_form
+    if 'cod_aff_form' in frame.columns:
+        for position, code in enumerate(frame['cod_aff_form'].tolist()):
+            aligned[position] = by_aff_form.get(code, -1)
+
+    reference_keys = _fallback_keys(reference.frame)
+    keys = _fallback_keys(frame)
+    missing = np.flatnonzero(aligned < 0)
+    if reference_keys is None or keys is None or not len(missing):
+        return aligned
+    # Seuls les couples uniques dans la session de référence servent d'alignement
+    by_key, duplicates = {}, set()
+    for position, key in enumerate(reference_keys):
+        if key in by_key:
+            duplicates.add(key)
+        by_key[key] = position
+    taken = set(aligned[aligned >= 0].tolist())
+    for position in missing.tolist():
+        key = keys[position]
+        match = by_key.get(key, -1)
+        if match >= 0 and key not in duplicates and match not in taken:
+            aligned[position] = match
+            taken.add(match)
+    return aligned
+
+def linear_projection(years, values):
+    """Droite des moindres carrés par ligne sur les valeurs connues : (pente, valeur projetée l'année suivante)
+
+    Une seule valeur connue donne une pente nulle ; aucune valeur donne NaN.
+    """
+    years = np.asarray(years, dtype=np.float64)
+    known = ~np.isnan(values)
+    x = np.where(known, years[None, :] - years[-1], 0.0)
+    y = np.where(known, values, 0.0)
+    count = known.sum(axis=1)
+    sum_x, sum_y = x.sum(axis=1), y.sum(axis=1)
+    sum_xy, sum_xx = (x * y).sum(axis=1), (x * x).sum(axis=1)
+    denominator = count * sum_xx - sum_x ** 2
+    slope = np.divide(count * sum_xy - sum_x * sum_y, denominator,
+                      out=np.zeros(len(values)), where=denominator > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        intercept = (sum_y - slope * sum_x) / count
+    # x est compté à partir de la dernière session : la session suivante est à x = 1
+    projected = np.where(count > 0, intercept + slope, np.nan)
+    return slope, projected
+
+class TrendTables:
+    """Indicateurs alignés (formations de la dernière session × sessions), évolutions et projection"""
+
+    def __init__(self, sessions, datasets):
+        self.sessions = [str(session) for session in sessions]
+        self.years = np.array([int(session) for session in self.sessions])
+        reference = datasets[-1]
+        # Seuls les repères de la dernière session sont gardés : les tables ne retiennent aucune partition
+        self.by_aff_form = reference.index.by_aff_form
+        self.frame_index = reference.frame.index
+        size = len(reference.frame)
+
+        self.values = {name: np.full((size, len(datasets)), np.nan) for name in TREND_MEASURES}
+        for column, dataset in enumerate(datasets):
+            aligned = (np.arange(size) if dataset is reference
+                       else align_positions(reference, dataset))
+            keep = aligned >= 0
+            for name, values in session_measures(dataset.frame).items():
+                self.values[name][aligned[keep], column] = values[keep]
+
+        # Évolution d'une session à la précédente (première session : NaN)
+        self.deltas = {}
+        for name, values in self.values.items():
+            previous, current = values[:, :-1], values[:, 1:]
+            if name in RELATIVE_MEASURES:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    delta = np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+            else:
+                delta = current - previous
+            self.deltas[name] = np.column_stack((np.full(size, np.nan), delta))
+
+        slope, projected = linear_projection(self.years, self.values['taux_pression'])
+        self.pressure_slope = slope
+        self.projected_pressure = np.fmax(projected, 0)
+        self.next_session = str(self.years[-1] + 1) if len(self.years) else None
+
+    def position(self, cod_aff_form):
+        """Position d'une formation dans les tables (None si absente de la dernière session)"""
+        return self.by_aff_form.get(cod_aff_form)
+
+    def history(self, position):
+        """Historique d'une formation : une ligne par session, indicateurs et évolutions"""
+        history = pd.DataFrame({'session': self.sessions})
+        for name in TREND_MEASURES:
+            history[name] = self.values[name][position]
+            history[f'evolution_{name}'] = self.deltas[name][position]
+        return history
+
+    def summary(self):
+        """Une ligne par formation : dernière valeur, dernière évolution et pression projetée"""
+        summary = {}
+        for name in TREND_MEASURES:
+            summary[name] = self.values[name][:, -1]
+            summary[f'evolution_{name}'] = self.deltas[name][:, -1]
+        summary['pente_pression'] = self.pressure_slope
+        summary['pression_projetee'] = self.projected_pressure
+        return pd.DataFrame(summary, index=self.frame_index)
+
+_cached = (None, None)
+
+def trend_tables(store=None, sessions=None):
+    """Tables d'évolution des sessions (toutes par défaut), recalculées seulement quand une partition change"""
+    global _cached
+    store = store or get_partitioned_store()
+    sessions = sorted(str(session) for session in (sessions or store.sessions()))
+    if not sessions:
+        return None
+    # Clé lue sur les fichiers : une table à jour est servie sans charger aucune partition
+    key = (store.data_dir, store.signatures(sessions))
+    if _cached[0] != key:
+        # Une seule combinaison gardée : les tables remplacées sont libérées
+        _cached = (key, TrendTables(sessions, store.get_many(sessions)))
+    return _cached[1]
@@ -0,0 +1,117 @@
+import threading
+from pathlib import Path
+
+from components.parcoursup.catalogue import catalogue_index
+from components.parcoursup.fitting import fitted_multipliers
+from components.parcoursup.partitions import get_partitioned_store
+from components.parcoursup.rank_model import rank_thresholds
+from components.parcoursup.recommend import filter_index
+from components.parcoursup.rollup import geo_rollup
+from components.parcoursup.search import search_index
+from components.parcoursup.spatial import spatial_index
+from components.parcoursup.store import DATA_DIR, data_version, file_signature, iter_stores
+
+DEFAULT_INTERVAL = 2.0
+
+# Tables dérivées construites avant la publication d'une nouvelle version
+WARM_TABLES = (
+    ('cube', lambda dataset: dataset.cube),
+    ('filter_index', filter_index),
+    ('search_index', search_index),
+    ('spatial_index', spatial_index),
+    ('catalogue_index', catalogue_index),
+    ('geo_rollup', geo_rollup),
+    ('rank_thresholds', rank_thresholds),
+    ('fitted_multipliers', fitted_multipliers)
+)
+
+def warm_dataset(dataset):
+    """Construit les tables dérivées d'une version ; une table en échec sera construite à la demande"""
+    for name, build in WARM_TABLES:
+        try:
+            build(dataset)
+        except Exception as e:
+            print(f"Erreur lors de la construction de {name}: {e}")
+
+def scan_directory(data_dir):
+    """Signatures (mtime, taille) de tous les fichiers visibles sous le dossier des données"""
+    signatures = {}
+    for path in Path(data_dir).rglob('*'):
+        # Fichiers temporaires d'écriture atomique ignorés (préfixés par un point)
+        if path.name.startswith('.') or not path.is_file():
+            continue
+        try:
+            signatures[path] = file_signature(path)
+        except FileNotFoundError:
+            continue
+    return signatures
+
+class DataWatcher:
+    """Surveille `.data/` en tâche de fond et recharge les stores quand un fichier change.
+
+    Le rechargement (lecture, schéma, index, indicateurs, tables dérivées de
+    WARM_TABLES) se fait dans ce thread, hors du chemin des requêtes ; chaque
+    store bascule ensuite atomiquement sur la nouvelle version et
+    `data_version()` est incrémenté.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, interval=DEFAULT_INTERVAL):
+        self.data_dir = Path(data_dir)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._signatures = scan_directory(self.data_dir)
+
+    def check(self):
+        """Compare l'état du dossier au précédent et recharge si besoin ; retourne True si un fichier a changé"""
+        signatures = scan_directory(self.data_dir)
+        if signatures == self._signatures:
+            return False
+        self._signatures = signatures
+        self.refresh()
+        return True
+
+    def refresh(self):
+        """Recharge tous les stores chargés (ceux dont le fichier n'a pas changé ne font rien)"""
+        stores = iter_stores() + get_partitioned_store().loaded_stores()
+        # L'export historique est à la fois un store partagé et une partition : rechargé une fois
+        for store in {id(store): store for store in stores}.values():
+            try:
+                store.get(warm=warm_dataset)
+            except Exception as e:
+                # L'ancienne version reste servie tant que la nouvelle ne se charge pas
+                print(f"Erreur lors du rechargement de {store.source}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Erreur du watcher de données: {e}")
+
+    def start(self):
+        """Démarre le thread de surveillance (sans effet s'il tourne déjà)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="parcoursup-data-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête le thread de surveillance"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def start_watcher(interval=DEFAULT_INTERVAL):
+    """Démarre le watcher partagé par tout le processus et retourne la version courante des données"""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = DataWatcher(interval=interval)
+        _watcher.start()
+    return data_version()
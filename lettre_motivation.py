@@ -25,7 +25,11 @@
     display_prediction_interface,
     display_global_interface,
     display_conseils,
-    display_profil_feedback
+    display_profil_feedback,
+    display_voeux_simulation,
+    display_catalogue_selector,
+    display_geo_breakdown,
+    display_formation_trends
 )
 
 def load_css():
@@ -247,12 +251,18 @@ def main():
                 # 1. Title
                 st.markdown("""
                     <h1 style='margin-bottom: 2rem;'>
-                        📊 Analyse des données Parcoursup 2024 - BUT Science des données
+                        📊 Analyse des données Parcoursup 2024
                     </h1>
                 """, unsafe_allow_html=True)
+
+                # Export complet : choix de la filière, les données sont restreintes par index
+                df, formation = display_catalogue_selector(df)
+                if formation:
+                    st.markdown(f"### {formation}")
                 
                 # 2. Display summary stats
                 display_summary_stats(df)
+                display_geo_breakdown(df)
                 
                 # 3. Show expanders
                 display_explain_stats(df)
@@ -296,19 +306,39 @@ def main():
                     #### Fiabilité
                     - Le modèle se base uniquement sur les données quantitatives disponibles
                     - Les éléments qualitatifs (lettre de motivation, projets personnels, etc.) peuvent influencer significativement la décision finale
+
+                    #### Modèle alternatif : rang du dernier appelé
+                    - Pour chaque groupe de classement, part des candidats du groupe qui ont été appelés (`ran_grp / nb_voe_pp`), les non classés comptant parmi les candidats
+                    - Votre rang est estimé par une plage de percentiles selon votre mention (TB : 0-20 %, B : 5-50 %, AB : 20-80 %, sans mention : 40-100 %)
+                    - La probabilité est la part de cette plage située avant le rang du dernier appelé
+
+                    #### Modèle alternatif : bonus ajustés par formation
+                    - Bonus mention modulé par la part de chaque mention chez les admis de la formation, comparée à l'ensemble des formations
+                    - Bonus boursier égal au taux de proposition des boursiers rapporté à celui de tous les candidats
+                    - Les formations à petits effectifs sont ramenées vers la moyenne de l'ensemble
+                    - Les bonus mention restent croissants (sans mention ≤ AB ≤ B ≤ TB) et jamais inférieurs à 1
+
+                    #### Modèle alternatif : régression logistique
+                    - Entraînée hors ligne sur les propositions par type de bac et statut boursier (`prop_tot_*`, `nb_voe_pp_*`)
+                    - Variables : taux d'accès, profil des admis (`pct_*`, `acc_*`), répartition des propositions, taux de pression
+                    - La mention agit comme un décalage fixe, l'export ne détaillant pas les candidats par mention
                     """)
                 
                 # 4. Add tabs for prediction models
-                tab1, tab2 = st.tabs(["🎯 Prédiction détaillée", "🌍 Comparaison globale"])
+                tab1, tab2, tab3 = st.tabs(["🎯 Prédiction détaillée", "🌍 Comparaison globale", "🎲 Simulation des vœux"])
                 
                 with tab1:
                     st.markdown("⚠️ Ces probabilités représentent vos chances de **recevoir une proposition de l'IUT**, pas d'être accepté définitivement. Ce modèle n'est sans doute pas parfait, j'ai sûrement omis des facteurs, et c'est justement pour ça que je veux rejoindre le BUT SD ! En tout cas, j'ai pris beaucoup de plaisir à le réaliser tout comme cette application.")
                     iut_choice, probability = display_prediction_interface(df, show_title=False)
                     display_profil_feedback(probability)
+                    display_formation_trends(df, iut_choice)
                 
                 with tab2:
                     display_global_interface(df)
                     display_conseils(df)
+
+                with tab3:
+                    display_voeux_simulation(df)
                     
         except Exception as e:
             st.error(f"Erreur lors du chargement des données: {str(e)}")